@@ -0,0 +1,102 @@
+"""
+For each named gene list of a GMT file, identify the frequent itemsets involving multiple ontologies terms.
+The genes identifiers of all the lists are resolved at once, and the annotations are loaded once and
+shared by the worker processes.
+"""
+
+from settings import *
+
+import gc
+import os
+import re
+import time as tm
+import pandas as pd
+import multiprocessing as mp
+import scripts.common as cmn
+import scripts.ontology as onto
+import scripts.enrichment as enrich
+import scripts.mining as mining
+import scripts.resolver as resolver
+
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+
+#_________________________________________ B A T C H __________________________________________
+
+#_________________________________________ L O A D I N G
+
+begin = tm.time()
+
+gene_sets = cmn.load_gmt(gmt_file)
+
+# the genes of all the lists are resolved with a single lookup
+list_genes = dict((name, genes) for name, genes in gene_sets.items())
+unresolved = dict((name, 0) for name in gene_sets.keys())
+if symbol:
+    gene_index = mining.load_gene_index(rdy2use_path, species)
+    resolution = resolver.resolve(gene_index, [g for genes in gene_sets.values() for g in genes])
+    resolution['name'] = [name for name, genes in gene_sets.items() for g in genes]
+    for name, list_resolution in resolution.groupby('name', sort = False):
+        list_genes[name] = resolver.get_resolved_ids(list_resolution, report = False)
+        unresolved[name] = int(list_resolution['id'].isna().sum())
+    del gene_index, resolution
+
+anno_path = "%s/%s_gene_annotation.json" % (rdy2use_path, species)
+annotation = mining.load_annotation(anno_path)
+
+# the pruned terms are computed once for all the lists
+pruned_terms = onto.get_pruned_ids(mining.load_term_metadata(rdy2use_path, species, hpo_obo_file), pruning_rules)
+
+background = None
+if enrichment:
+    background = enrich.load_background("%s/%s_background.npz" % (rdy2use_path, species), anno_path)
+
+end_load = tm.time()
+
+#_________________________________________ M I N I N G
+
+os.makedirs(batch_path, exist_ok = True)
+
+# one rules file per list, named after the list
+tasks = []
+used_names = set()
+for name in gene_sets.keys():
+    stem = re.sub(r"[^\w.-]", "_", name)
+    filename = "%s_rules.csv" % stem
+    k = 1
+    while filename in used_names:
+        k += 1
+        filename = "%s_%s_rules.csv" % (stem, k)
+    used_names.add(filename)
+    tasks.append((name, list_genes[name], filename))
+
+shared = {
+    'annotation': annotation,
+    'pruned_terms': pruned_terms,
+    'background': background,
+    'min_support': min_support,
+    'max_len': max_len,
+    'metric': metric,
+    'min_threshold': min_threshold,
+    'out_path': batch_path}
+
+# keep the shared objects out of the garbage collector so that forked workers do not copy them
+gc.freeze()
+with mp.Pool(n_jobs, initializer = mining.init_worker, initargs = (shared,)) as pool:
+    index = pool.map(mining.mine_gene_list, tasks, chunksize = 1)
+for row in index:
+    row.update({'genes': len(gene_sets[row['name']]), 'unresolved_genes': unresolved[row['name']]})
+
+pd.DataFrame(index).to_csv("%s/index.csv" % batch_path, index=False)
+print("WROTE: %s/index.csv" % batch_path)
+
+end_min = tm.time()
+
+print("\nbatch mining of %s gene lists completed in %s seconds:\n \
+    .loading: %ss\n \
+    .mining: %ss\n" % (
+        len(gene_sets),
+        (end_min - begin),
+        (end_load - begin),
+        (end_min - end_load)))
@@ -0,0 +1,192 @@
+"""
+Benchmarks the preparation and mining hot paths on synthetic ontologies and annotations shaped like
+GO, Reactome and HPO, so that regressions can be caught offline without downloading the real data.
+
+For each stage, the wall time, the throughput and the peak traced memory are appended as JSON lines
+to bench_file, and compared to the previous run of the same scale found in that file.
+"""
+
+from settings import *
+
+import os
+import json
+import tempfile
+import tracemalloc
+import time as tm
+from goatools import obo_parser
+import scripts.common as cmn
+import scripts.ontology as onto
+import scripts.reactome as rc
+import scripts.mining as mining
+import scripts.synthetic as syn
+import scripts.wofptree as wofp
+
+def measure(stage, func, n_items, repeat = True):
+    """
+    # Description
+    Runs a stage timed, then with its memory allocations traced, and returns its result and its
+    record: wall time, items processed per second and peak traced memory. \n
+    Short stages are timed up to 5 times, within half a second, and their fastest run is kept. \n
+    The stages writing files run once, so that their files and logs are not written again, and their
+    memory is not traced.
+
+    # Arguments
+    ``stage`` (string): the name of the stage. \n
+    ``func`` (function): the stage, called without arguments. \n
+    ``n_items`` (int): the number of items (terms, genes, transactions) processed by the stage. \n
+    ``repeat`` (boolean): can the stage be run several times ? False for the stages writing files.
+
+    # Usage
+    >>> dag, record = measure("make_dag", lambda: syn.make_dag("GO:%07d", "biological_process", 1000, 8, 1.6), 1000)
+    >>> print(record)
+    ... {'stage': 'make_dag', 'items': 1000, 'seconds': 0.0107, 'items_per_second': 93457.9, 'peak_mb': 0.78}
+    """
+    times = []
+    while not times or (repeat and sum(times) < 0.5 and len(times) < 5):
+        start = tm.perf_counter()
+        result = func()
+        times.append(tm.perf_counter() - start)
+    seconds = min(times)
+    peak = None
+    if repeat:
+        # tracing slows the allocations down, the memory is measured on a separate run
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    record = {
+        'stage': stage,
+        'items': n_items,
+        'seconds': round(seconds, 4),
+        'items_per_second': round(n_items / seconds, 1) if seconds > 0 else None,
+        'peak_mb': round(peak / 2**20, 2) if peak is not None else None}
+    print("%-24s %8s items %10.3fs %12s items/s %10s MB" % (
+        stage, n_items, seconds, record['items_per_second'], record['peak_mb']))
+    return result, record
+
+def load_previous(bench_file, scale):
+    """Returns the last record of each stage found in a results file for the same scale."""
+    previous = {}
+    if os.path.exists(bench_file):
+        with open(bench_file, 'rt') as bf:
+            for line in bf:
+                record = json.loads(line)
+                if record['scale'] == scale:
+                    previous[record['stage']] = record
+    return previous
+
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+
+#_________________________________________ B E N C H M A R K __________________________________________
+
+begin = tm.time()
+run = tm.strftime("%Y-%m-%dT%H:%M:%S")
+records = []
+tmp_dir = tempfile.TemporaryDirectory()
+
+#_________________________________________ O N T O L O G I E S
+
+dags = {}
+for name, shape in syn.SHAPES.items():
+    n_terms = max(10, int(shape['n_terms'] * bench_scale))
+    dags[name], record = measure("make_dag_%s" % name, lambda: syn.make_dag(
+        shape['prefix'], shape['namespace'], n_terms, shape['depth'], shape['fan_in'], seed = 0), n_terms)
+    records.append(record)
+
+hier_path = "%s/reactome_hierarchy.txt" % tmp_dir.name
+labl_path = "%s/reactome_label.txt" % tmp_dir.name
+syn.write_reactome_files(dags['Reactome'], hier_path, labl_path)
+dags['Reactome'], record = measure("load_reacterm_dict",
+    lambda: rc.load_reacterm_dict(hier_path, labl_path), len(dags['Reactome']))
+records.append(record)
+
+obo_dags = {}
+for name in dags.keys():
+    obo_path = "%s/%s.obo" % (tmp_dir.name, name)
+    _, record = measure("save_as_obo_%s" % name,
+        lambda: onto.save_as_obo(dags[name], obo_path, "ontology: %s" % name.lower()), len(dags[name]),
+        repeat = False)
+    records.append(record)
+    obo_dags[name], record = measure("load_obo_%s" % name,
+        lambda: obo_parser.GODag(obo_path, prt = None), len(dags[name]))
+    records.append(record)
+
+#_________________________________________ A N N O T A T I O N S
+
+n_genes = max(10, int(bench_genes * bench_scale))
+leaf_annotation = syn.make_annotation(dags, n_genes, seed = 0)
+
+def get_ancestries(name):
+    return dict((gene_id, list(onto.get_ancestry_id(gene_id, leaf_annotation[name], obo_dags[name])))
+        for gene_id in leaf_annotation[name].keys())
+
+rdy2use_data = {}
+for name in dags.keys():
+    ancestries, record = measure("get_ancestry_id_%s" % name, lambda: get_ancestries(name), len(leaf_annotation[name]))
+    records.append(record)
+    for gene_id in ancestries.keys():
+        rdy2use_data.setdefault(gene_id, dict((k, []) for k in dags.keys()))[name] = ancestries[gene_id]
+# as in data_preparation.py, only the genes annotated by several ontologies are kept
+rdy2use_data = dict((k, v) for k, v in rdy2use_data.items() if sum(len(ids) > 0 for ids in v.values()) > 1)
+
+anno_path = "%s/gene_annotation.json" % tmp_dir.name
+_, record = measure("save_as_json", lambda: cmn.save_as_json(rdy2use_data, anno_path), len(rdy2use_data),
+    repeat = False)
+records.append(record)
+
+#_________________________________________ M I N I N G
+
+ontologies = {'GO': obo_dags['GO'], 'R-': obo_dags['Reactome'], 'HP': obo_dags['HPO']}
+metadata, record = measure("get_term_metadata",
+    lambda: onto.get_term_metadata(ontologies, rdy2use_data), sum(len(dag) for dag in dags.values()))
+records.append(record)
+pruned_terms, record = measure("get_pruned_ids", lambda: onto.get_pruned_ids(metadata, pruning_rules), len(metadata))
+records.append(record)
+gene_list = sorted(rdy2use_data.keys())[:bench_list_genes]
+transactions = list(mining.get_gene_transactions(gene_list, rdy2use_data, pruned_terms).values())
+
+itemsets, record = measure("fpgrowth",
+    lambda: mining.mine_itemsets(transactions, min_support = min_support, max_len = max_len), len(transactions))
+records.append(record)
+# the rules are generated and written in chunks, as in itemset_mining.py
+n_rules, record = measure("iter_rules", lambda: sum(len(rules) for rules in mining.iter_rules(
+    itemsets, metric = metric, min_threshold = min_threshold, chunk_size = rules_chunk_size)), len(itemsets))
+records.append(record)
+_, record = measure("save_rules", lambda: mining.save_rules(mining.iter_rules(itemsets, metric = metric,
+    min_threshold = min_threshold, chunk_size = rules_chunk_size), "%s/rules.csv" % tmp_dir.name), n_rules,
+    repeat = False)
+records.append(record)
+
+weight_items = dict(zip(metadata['id'], onto.get_term_weights(metadata)))
+freq_items, weight_trans = wofp.get_frequency_and_weight(transactions, weight_items, min_sup = min_support)
+(tree, item_nodes), record = measure("construct_fptree",
+    lambda: wofp.construct_fptree(transactions, freq_items, weight_trans), len(transactions))
+records.append(record)
+_, record = measure("get_association_rules",
+    lambda: wofp.get_association_rules(tree, item_nodes, min_weight = min_support), len(item_nodes))
+records.append(record)
+
+tmp_dir.cleanup()
+
+#_________________________________________ E X P O R T
+
+previous = load_previous(bench_file, bench_scale)
+with open(bench_file, 'at') as bf:
+    for record in records:
+        record.update({'run': run, 'scale': bench_scale, 'genes': n_genes, 'list_genes': len(transactions)})
+        bf.write("%s\n" % json.dumps(record))
+print("WROTE: %s" % bench_file)
+
+regressions = []
+for record in records:
+    if record['stage'] in previous:
+        ratio = record['seconds'] / max(previous[record['stage']]['seconds'], 1e-4)
+        if ratio > bench_tolerance:
+            regressions.append("%s: %.2fx slower than on %s" % (record['stage'], ratio, previous[record['stage']]['run']))
+if regressions:
+    print("\nregressions:\n    .%s" % "\n    .".join(regressions))
+
+end = tm.time()
+print("\nbenchmark completed in %s seconds" % (end - begin))
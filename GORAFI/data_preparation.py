@@ -21,12 +21,17 @@ from Bio.UniProt.GOA import gafiterator
 from settings import *
 
 
-import time as tm
+import os
+from collections import Counter
 import pandas as pd
 import scripts.ontology as onto
 import scripts.common as cmn
 import scripts.reactome as rc
 import scripts.hpo as hpo
+import scripts.enrichment as enrich
+import scripts.instrument as instrument
+import scripts.termstore as termstore
+import scripts.resolver as resolver
 
 # - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
 # - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
@@ -36,71 +41,111 @@ import scripts.hpo as hpo
 
 #_________________________________________ D O W N L O A D I N G
 
-begin = tm.time()
+tracer = instrument.Tracer(spans_file, trace_memory, profile_spans, profile_path)
+tracer.start("downloading")
 
-associations.dnld_annotation(gaf_file)
-cmn.replace_first_line(gaf_file, "!gaf-version: 2.1\n")
-cmn.download_url(go_obo_url, go_obo_file)
-cmn.download_url(reactome_hierarchy_url, reactome_hierarchy_file)
-cmn.download_url(reactome_label_url, reactome_label_file)
-cmn.download_url(reactome_annotation_url, reactome_annotation_file)
+with tracer.span("gaf") as span:
+    associations.dnld_annotation(gaf_file)
+    cmn.replace_first_line(gaf_file, "!gaf-version: 2.1\n")
+    span.set(bytes = os.path.getsize(gaf_file))
+
+downloads = [
+    ("go_obo", go_obo_url, go_obo_file),
+    ("reactome_hierarchy", reactome_hierarchy_url, reactome_hierarchy_file),
+    ("reactome_label", reactome_label_url, reactome_label_file),
+    ("reactome_annotation", reactome_annotation_url, reactome_annotation_file)]
+for name, url, filename in downloads:
+    with tracer.span(name) as span:
+        cmn.download_url(url, filename)
+        span.set(bytes = os.path.getsize(filename))
 
 if species == "human":
-    cmn.download_replace_first(hpo_annotation_url, hpo_annotation_file, "")
-    cmn.download_url(hpo_obo_url, hpo_obo_file)
+    with tracer.span("hpo_annotation") as span:
+        cmn.download_url(hpo_annotation_url, hpo_annotation_file)
+        span.set(bytes = os.path.getsize(hpo_annotation_file))
+    with tracer.span("hpo_obo") as span:
+        cmn.download_url(hpo_obo_url, hpo_obo_file)
+        span.set(bytes = os.path.getsize(hpo_obo_file))
 
-end_dl = tm.time()
+tracer.stop()
 
 #_________________________________________ L O A D I N G
 
+tracer.start("loading")
+
 ## GO ANNOTATIONS
+span = tracer.start("gaf")
 gene_go_annotation = {}
-gene_symbol_id = set()
+# GO terms annotating the genes with a non electronic evidence
+gene_go_curated = {}
+# (identifier, kind, UniProtKB ID) records of the genes
+gene_identifiers = set()
+n_records = 0
 with open(gaf_file, 'rt') as gaf:
     for anno in gafiterator(gaf):
-        gene_symbol_id.add((anno['DB_Object_Symbol'], anno['DB_Object_ID']))
+        n_records += 1
+        gene_identifiers.add((anno['DB_Object_Symbol'], "symbol", anno['DB_Object_ID']))
+        gene_identifiers.update((syn, "synonym", anno['DB_Object_ID']) for syn in anno['Synonym'])
         try:
             gene_go_annotation[anno['DB_Object_ID']].add(anno['GO_ID'])
         except KeyError:
             gene_go_annotation[anno['DB_Object_ID']] = set([anno['GO_ID']])
-gene_symbol_id_dict = dict((x, y) for x, y in gene_symbol_id)
+        if anno['Evidence'] != "IEA":
+            gene_go_curated.setdefault(anno['DB_Object_ID'], set()).add(anno['GO_ID'])
+span.set(records = n_records, genes = len(gene_go_annotation), identifiers = len(gene_identifiers))
+tracer.stop(span)
 
 ## GO ONTOLOGY
-go_onto = obo_parser.GODag(go_obo_file, optional_attrs = "relationship")
+with tracer.span("go_obo") as span:
+    go_onto = obo_parser.GODag(go_obo_file, optional_attrs = "relationship")
+    span.set(terms = len(go_onto))
 
 ## REACTOME ANNOTATIONS
-gene_reactome_annotation = rc.load_reactome_annotation(reactome_annotation_file)
+with tracer.span("reactome_annotation") as span:
+    gene_reactome_curated = {}
+    gene_reactome_annotation = rc.load_reactome_annotation(reactome_annotation_file, gene_reactome_curated)
+    span.set(genes = len(gene_reactome_annotation))
 
 ## REACTOME ONTOLOGY
-reacterm = rc.load_reacterm_dict(reactome_hierarchy_file, reactome_label_file)
-onto.save_as_obo(reacterm, reactome_obo_file, "ontology: reactome")
-react_onto = obo_parser.GODag(reactome_obo_file)
+with tracer.span("reactome_obo") as span:
+    reacterm = rc.load_reacterm_dict(reactome_hierarchy_file, reactome_label_file)
+    onto.save_as_obo(reacterm, reactome_obo_file, "ontology: reactome")
+    react_onto = obo_parser.GODag(reactome_obo_file)
+    span.set(terms = len(react_onto))
 species_genes = set(gene_go_annotation.keys())
 species_genes.update(set(gene_reactome_annotation.keys()))
 
+## GENE IDENTIFIERS
+with tracer.span("gene_index") as span:
+    gene_identifiers.update((gene_id, "accession", gene_id) for gene_id in species_genes)
+    # an ambiguous identifier is resolved to the gene with the most GO annotations
+    gene_index = resolver.get_resolution_index(gene_identifiers,
+        dict((gene_id, len(gene_go_annotation[gene_id])) for gene_id in gene_go_annotation.keys()))
+    del gene_identifiers
+    span.set(identifiers = len(gene_index), ambiguous = int((gene_index['candidates'] != "").sum()))
+
 if species == "human":    
     ## HPO ANNOTATIONS
-    gene_hpo_annotation = hpo.load_hpo_annotation(hpo_annotation_file)
-    gene_uniprotkb_hpo_annotation = []
-    # replace gene symbols by their UniProtKB IDs
-    for symbol in gene_hpo_annotation.keys():
-        try:
-            uniprotkb_id = gene_symbol_id_dict[symbol]
-            gene_uniprotkb_hpo_annotation.append((uniprotkb_id, gene_hpo_annotation[symbol]))
-        except KeyError:
-            pass
-    gene_hpo_annotation = dict((x, y) for x, y in gene_uniprotkb_hpo_annotation)
-    species_genes.update(set(gene_hpo_annotation.keys()))
+    # the genes symbols are replaced by their UniProtKB IDs while reading
+    with tracer.span("hpo_annotation") as span:
+        gene_hpo_annotation = hpo.load_hpo_annotation(hpo_annotation_file, gene_index)
+        species_genes.update(set(gene_hpo_annotation.keys()))
+        span.set(genes = len(gene_hpo_annotation))
 
 ## HPO ONTOLOGY
-hpo_onto = obo_parser.GODag(hpo_obo_file)
+with tracer.span("hpo_obo") as span:
+    hpo_onto = obo_parser.GODag(hpo_obo_file)
+    span.set(terms = len(hpo_onto))
 
 # Terms related to the species on the ontologies
 filtered_go_onto_keys = set()
 filtered_react_onto_keys = set()
 
 # get the GO, Reactome (and if species == human, HPO) leaf nodes corresponding to each gene.
+span = tracer.start("ancestry", genes = len(species_genes))
 rdy2use_data = {}
+# number of genes annotated by each term with a non electronic evidence (the HPO annotations are curated)
+n_curated = Counter()
 for gene_id in species_genes:
 
     # count the annotation sources for this gene:
@@ -146,35 +191,55 @@ for gene_id in species_genes:
         rdy2use_data[gene_id] = {'GO': gene_goid, 'Reactome': gene_reactid}
         if species == "human":
             rdy2use_data[gene_id]['HPO'] = gene_hpoid
-
-end_load = tm.time()
+            n_curated.update(gene_hpoid)
+        curated_goid = set()
+        for goid in gene_go_curated.get(gene_id, ()):
+            if go_onto[goid].namespace == aspect:
+                curated_goid.update(go_onto[goid].get_all_upper())
+        n_curated.update(curated_goid)
+        if gene_id in gene_reactome_curated:
+            n_curated.update(onto.get_ancestry_id(gene_id, gene_reactome_curated, react_onto))
+span.set(
+    annotated_genes = len(rdy2use_data),
+    go_terms = len(filtered_go_onto_keys),
+    reactome_terms = len(filtered_react_onto_keys))
+tracer.stop(span)
+
+tracer.stop()
 
 #_________________________________________ E X P O R T
 
-## Filter the GO terms and the REACTerms on the ontologies according to the species
-delete_go_keys = set(go_onto.keys()).difference(filtered_go_onto_keys)
-for k in delete_go_keys:
-    go_onto.pop(k)
-delete_react_keys = set(react_onto.keys()).difference(filtered_react_onto_keys)
-for k in delete_react_keys:
-    react_onto.pop(k)
+tracer.start("exporting")
+
+## Keep the GO terms and the REACTerms of the species, without editing the ontologies
+go_terms = dict((k, term) for k, term in go_onto.items() if k in filtered_go_onto_keys)
+react_terms = dict((k, term) for k, term in react_onto.items() if k in filtered_react_onto_keys)
 
 ## Export the generated data as rdy2use files.
-cmn.save_as_json(rdy2use_data, "%s/%s_gene_annotation.json" % (rdy2use_path, species))
-onto.save_as_obo(go_onto, "%s/%s_go-basic.obo" % (rdy2use_path, species), "ontology: go")
-onto.save_as_obo(react_onto, "%s/%s_reactome.obo" % (rdy2use_path, species), "ontology: reactome")
-with open("%s/%s_gene_symbol.csv" % (rdy2use_path, species), 'wt') as csv:
-    csv.write("symbol,id\n")
-    for key in gene_symbol_id_dict.keys():
-        csv.write("%s,%s\n" % (key, gene_symbol_id_dict[key]))
-
-end_exp = tm.time()
-
-print("\ndata preparation completed in %s seconds:\n \
-    .downloading: %ss\n \
-    .loading: %ss\n \
-    .exporting: %ss\n"  % (
-        (end_exp - begin), 
-        (end_dl - begin), 
-        (end_load - end_dl),
-        (end_exp - end_load)))
\ No newline at end of file
+with tracer.span("annotation_json", genes = len(rdy2use_data)):
+    cmn.save_as_json(rdy2use_data, "%s/%s_gene_annotation.json" % (rdy2use_path, species))
+with tracer.span("background") as span:
+    background = enrich.get_background(rdy2use_data)
+    enrich.save_background(background, "%s/%s_background.npz" % (rdy2use_path, species))
+    span.set(genes = background['matrix'].shape[0], terms = background['matrix'].shape[1])
+with tracer.span("term_metadata") as span:
+    exported_ontologies = {'GO': go_terms, 'R-': react_terms}
+    if species == "human":
+        exported_ontologies['HP'] = hpo_onto
+    metadata = onto.get_term_metadata(exported_ontologies, rdy2use_data, n_curated)
+    metadata['weight'] = onto.get_term_weights(metadata, weight_factors)
+    onto.save_term_metadata(metadata, "%s/%s_term_metadata.csv" % (rdy2use_path, species))
+    span.set(terms = len(metadata))
+with tracer.span("term_store", terms = len(metadata), genes = len(rdy2use_data)):
+    termstore.build_term_store("%s/%s_ontology.sqlite" % (rdy2use_path, species), metadata, exported_ontologies, rdy2use_data)
+with tracer.span("go_obo", terms = len(go_terms)):
+    onto.save_as_obo(go_onto, "%s/%s_go-basic.obo" % (rdy2use_path, species), "ontology: go", keys = filtered_go_onto_keys)
+with tracer.span("reactome_obo", terms = len(react_terms)):
+    onto.save_as_obo(react_onto, "%s/%s_reactome.obo" % (rdy2use_path, species), "ontology: reactome",
+        keys = filtered_react_onto_keys)
+with tracer.span("gene_index", identifiers = len(gene_index)):
+    resolver.save_resolution_index(gene_index, "%s/%s_gene_index.csv" % (rdy2use_path, species))
+
+tracer.stop()
+
+tracer.report("data preparation")
\ No newline at end of file
@@ -4,16 +4,29 @@ For a given set of genes, identify the frequent itemsets involving multiple onto
 
 from goatools import obo_parser
 from settings import *
-from mlxtend.frequent_patterns import apriori, fpgrowth, association_rules
+from mlxtend.frequent_patterns import apriori, association_rules
 from mlxtend.preprocessing.transactionencoder import TransactionEncoder
 # from itemset_mining.two_phase_huim import TwoPhase
 
 import csv
 import json
-import time as tm
 import pandas as pd
-import scripts.common as cmn
 import scripts.ontology as onto
+import scripts.pfp as pfp
+import scripts.wofptree as wofp
+import scripts.cantree as cantree
+import scripts.multisupport as multisupport
+import scripts.contrast as contrast
+import scripts.bitmap as bitmap
+import scripts.outofcore as outofcore
+import scripts.sampling as sampling
+import scripts.permutation as permutation
+import scripts.enrichment as enrich
+import scripts.mining as mining
+import scripts.instrument as instrument
+import scripts.resolver as resolver
+import scripts.rulestore as rulestore
+import scripts.similarity as similarity
 
 # - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
 # - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
@@ -23,45 +36,71 @@ import scripts.ontology as onto
 
 #_________________________________________ L O A D I N G
 
-begin = tm.time()
+# the multiple minimum supports only apply to the frequent itemsets mined from the whole gene list
+if min_supports:
+    conflicts = [name for name, value in [("out_of_core", out_of_core), ("contrast_genes", contrast_genes),
+        ("weighted", weighted), ("approximate", approximate), ("cantree_file", cantree_file)] if value]
+    if conflicts:
+        raise ValueError("min_supports cannot be combined with %s" % ", ".join(conflicts))
 
-# Convert gene ids into symbols
+tracer = instrument.Tracer(spans_file, trace_memory, profile_spans, profile_path)
+tracer.start("loading")
+
+# Convert gene symbols, synonyms and accessions into UniProtKB IDs
 if symbol:
-    reader = csv.reader(open("%s/%s_gene_symbol.csv" % (rdy2use_path, species), 'rt'))
-    gene_symbol_id_dict = {}
-    for row in reader:
-        k, v = row
-        gene_symbol_id_dict[k] = v
-    genes = cmn.get_values_from_keys(genes, gene_symbol_id_dict)
-
-ontologies = {
-    'GO': obo_parser.GODag("%s/%s_go-basic.obo" % (rdy2use_path, species)), 
-    'R-': obo_parser.GODag("%s/%s_reactome.obo" % (rdy2use_path, species))}
-if species == "human":
-    ontologies['HP'] = obo_parser.GODag(hpo_obo_file)
-
-
-## extract the annotations corresponding to the selected genes:
-with open("%s/%s_gene_annotation.json" % (rdy2use_path, species), 'rt') as jn:
-    annotation = json.load(jn)
-print(annotation[gene_symbol_id_dict["A8MVA2"]]['GO'])
-
-common_keys = set(genes).intersection(set(annotation.keys()))
-transactions = cmn.get_values_from_keys(common_keys, annotation)
-te = TransactionEncoder()
-trans_bool = te.fit(transactions).transform(transactions)
-df = pd.DataFrame(trans_bool, columns=te.columns_)
-
-for col in df.columns:
-    term = ontologies[col[:2]][col]
-    if col[:2] != "R-":
-        if term.depth == 0:
-            df = df.drop(columns=col)
-    else:
-        if term.depth * term.level <= term.level + term.depth:
-            df = df.drop(columns=col)
+    with tracer.span("resolution", genes = len(genes)) as span:
+        gene_index = mining.load_gene_index(rdy2use_path, species)
+        resolution = resolver.resolve(gene_index, genes)
+        genes = resolver.get_resolved_ids(resolution)
+        span.set(
+            identifiers = len(gene_index),
+            resolved_genes = len(genes),
+            unresolved_genes = int(resolution['id'].isna().sum()))
+        if contrast_genes:
+            contrast_resolution = resolver.resolve(gene_index, contrast_genes)
+            contrast_genes = resolver.get_resolved_ids(contrast_resolution)
+            span.set(
+                resolved_contrast_genes = len(contrast_genes),
+                unresolved_contrast_genes = int(contrast_resolution['id'].isna().sum()))
+
+anno_path = "%s/%s_gene_annotation.json" % (rdy2use_path, species)
+
+with tracer.span("store"):
+    store = mining.load_term_store(rdy2use_path, species, hpo_obo_file)
 
-end_load = tm.time()
+if out_of_core:
+    # the annotations are streamed during the mining
+    with tracer.span("pruning") as span:
+        metadata = store.get_terms()
+        pruned_terms = onto.get_pruned_ids(metadata, pruning_rules)
+        span.set(terms = len(metadata), pruned_terms = len(pruned_terms))
+else:
+    ## extract the annotations corresponding to the selected genes:
+    with tracer.span("annotation") as span:
+        if n_permutations > 0:
+            # the random gene sets are drawn from all the annotated genes
+            annotation = mining.load_annotation(anno_path)
+        else:
+            annotation = store.get_annotation(list(genes) + list(contrast_genes))
+        span.set(genes = len(annotation))
+    ## only the terms of the selected genes are read from the store
+    with tracer.span("pruning") as span:
+        gene_terms = set(t_id for gene_id in set(genes).union(contrast_genes).intersection(annotation.keys())
+            for ids in annotation[gene_id].values() for t_id in ids)
+        metadata = store.get_terms(gene_terms)
+        pruned_terms = onto.get_pruned_ids(metadata, pruning_rules)
+        span.set(terms = len(metadata), pruned_terms = len(pruned_terms))
+    with tracer.span("encoding", genes = len(genes)) as span:
+        gene_transactions = mining.get_gene_transactions(genes, annotation, pruned_terms)
+        span.set(
+            annotated_genes = len(gene_transactions),
+            items = sum(len(t) for t in gene_transactions.values()))
+        if contrast_genes:
+            contrast_transactions = mining.get_gene_transactions(contrast_genes, annotation, pruned_terms)
+            span.set(annotated_contrast_genes = len(contrast_transactions))
+store.close()
+
+tracer.stop()
 
 #_________________________________________ M I N I N G
 
@@ -75,18 +114,139 @@ def has_same_ontology(itemset):
         prev_e = e
     return True
 
-def str_from_iterable(iterable):
-    iterable = list(iterable)
-    string = iterable[0]
-    for i in range(1, len(iterable)):
-        string += ",%s" % iterable[i]
-    return string
+tracer.start("mining")
+
+if out_of_core:
+    with tracer.span("out_of_core") as span:
+        n_itemsets = outofcore.mine_out_of_core(anno_path, "itemsets.csv", min_support = min_support, max_len = max_len,
+            memory_budget = memory_budget, tmp_path = tmp_path, n_partitions = n_partitions, pruned_terms = pruned_terms)
+        span.set(itemsets = n_itemsets)
+elif contrast_genes:
+    # the supports of the patterns in both lists are counted together
+    with tracer.span("contrast", genes = len(gene_transactions), contrast_genes = len(contrast_transactions)) as span:
+        patterns = contrast.mine_contrast_patterns(list(gene_transactions.values()),
+            list(contrast_transactions.values()), min_support = min_support, min_difference = min_difference,
+            min_growth = min_growth, max_len = max_len, rank = contrast_rank)
+        span.set(patterns = len(patterns))
+elif weighted:
+    # the weights of the terms are read from the term store with their metadata
+    transactions = list(gene_transactions.values())
+    weight_items = dict(zip(metadata['id'], metadata['weight']))
+    if approximate:
+        # the weights of the patterns mined on the sample are given with their bounds
+        with tracer.span("approximate_wofp", genes = len(transactions)) as span:
+            patterns = sampling.approximate_wofp(transactions, weight_items, min_sup = min_support,
+                min_weight = min_weight, epsilon = epsilon, delta = delta, verify = verify, seed = seed)
+            span.set(patterns = len(patterns))
+    else:
+        with tracer.span("wofp", genes = len(transactions), n_jobs = n_jobs) as span:
+            if n_jobs == 1:
+                freq_items, weight_trans = wofp.get_frequency_and_weight(transactions, weight_items, min_sup = min_support)
+                tree, item_nodes = wofp.construct_fptree(transactions, freq_items, weight_trans)
+                patterns = wofp.get_association_rules(tree, item_nodes, min_weight = min_weight)
+            else:
+                patterns = pfp.parallel_wofp(transactions, weight_items, min_sup = min_support, min_weight = min_weight,
+                    n_jobs = n_jobs)
+            patterns = pd.DataFrame({'pattern': list(patterns.keys()), 'weight': list(patterns.values())})
+            span.set(patterns = len(patterns))
+elif approximate:
+    with tracer.span("approximate", genes = len(gene_transactions)) as span:
+        itemsets = sampling.approximate_fpgrowth(list(gene_transactions.values()), min_support = min_support,
+            max_len = max_len, epsilon = epsilon, delta = delta, verify = verify, seed = seed)
+        span.set(itemsets = len(itemsets))
+elif min_supports:
+    # the minimum supports of the terms are enforced while the tree is built and mined
+    with tracer.span("multiple_supports", genes = len(gene_transactions)) as span:
+        term_min_supports = multisupport.get_min_supports(metadata, min_supports, min_support)
+        itemsets = multisupport.mine_itemsets(list(gene_transactions.values()), term_min_supports,
+            min_support = min_support, max_len = max_len)
+        span.set(itemsets = int(itemsets['frequent'].sum()), subsets = int((~itemsets['frequent']).sum()))
+elif cantree_file:
+    # only the genes added to or removed from the previous list are processed
+    with tracer.span("cantree", genes = len(gene_transactions)) as span:
+        tree = cantree.load_cantree(cantree_file)
+        cantree.sync_transactions(tree, gene_transactions)
+        itemsets = tree.get_itemsets(min_support, max_len = max_len)
+        cantree.save_cantree(tree, cantree_file)
+        span.set(tree_nodes = sum(len(nodes) for nodes in tree.header.values()), itemsets = len(itemsets))
+else:
+    transactions = list(gene_transactions.values())
+    with tracer.span("fpgrowth", genes = len(transactions), n_jobs = n_jobs) as span:
+        if n_jobs == 1:
+            itemsets = mining.mine_itemsets(transactions, min_support = min_support, max_len = max_len)
+        else:
+            te = TransactionEncoder()
+            trans_bool = te.fit(transactions).transform(transactions)
+            df = pd.DataFrame(trans_bool, columns=te.columns_)
+            itemsets = pfp.parallel_fpgrowth(df, min_support = min_support, max_len = max_len, n_jobs = n_jobs)
+        span.set(itemsets = len(itemsets))
+# the rules are streamed to their file, unless all of them are needed to be tested, clustered or indexed
+stream_rules = n_permutations == 0 and not enrichment and not rule_similarity and output_backend != "sqlite"
+if contrast_genes and not out_of_core:
+    with tracer.span("export", patterns = len(patterns)):
+        patterns.assign(itemsets = patterns['itemsets'].map(lambda x: ",".join(sorted(x)))).to_csv(
+            "contrast_patterns.csv", index = False)
+        print("WROTE: contrast_patterns.csv")
+elif weighted and not out_of_core:
+    with tracer.span("export", patterns = len(patterns)):
+        # the item and its parent item are written as comma separated terms
+        patterns.assign(pattern = patterns['pattern'].map(",".join)).to_csv("weighted_patterns.csv", index = False)
+        print("WROTE: weighted_patterns.csv")
+elif not out_of_core and stream_rules:
+    with tracer.span("rules", itemsets = len(itemsets)) as span:
+        span.set(rules = mining.save_rules(mining.iter_rules(itemsets, metric = metric, min_threshold = min_threshold,
+            chunk_size = rules_chunk_size), "rules.%s" % output_backend))
+elif not out_of_core:
+    with tracer.span("rules", itemsets = len(itemsets)) as span:
+        rules = association_rules(itemsets, metric = metric, min_threshold = min_threshold)
+        if 'frequent' in itemsets.columns:
+            # the subsets of the frequent itemsets only provide the supports of the rules
+            frequent = set(itemsets.loc[itemsets['frequent'], 'itemsets'])
+            rules = rules[[a | c in frequent for a, c in zip(rules['antecedents'], rules['consequents'])]]
+            itemsets = itemsets[itemsets['frequent']]
+        span.set(rules = len(rules))
+    if n_permutations > 0:
+        with tracer.span("permutations", rules = len(rules), permutations = n_permutations):
+            rules = permutation.add_permutation_pvalues(rules, annotation, len(gene_transactions),
+                n_permutations = n_permutations, min_support = min_support, metric = metric,
+                min_threshold = min_threshold, n_jobs = n_jobs, seed = seed)
+    if enrichment:
+        with tracer.span("enrichment", rules = len(rules)):
+            background = enrich.load_background("%s/%s_background.npz" % (rdy2use_path, species), anno_path)
+            rules = enrich.add_enrichment_pvalues(rules, background, len(gene_transactions))
+    if rule_similarity:
+        with tracer.span("clustering", rules = len(rules)) as span:
+            n_cluster_itemsets = len(similarity.get_rule_itemsets(rules)[0])
+            span.set(itemsets = n_cluster_itemsets)
+            # the mined rules are still written when they are too many to be clustered
+            if n_cluster_itemsets > max_cluster_itemsets:
+                print("UNCLUSTERED: %s distinct rule itemsets, above max_cluster_itemsets (%s)" % (
+                    n_cluster_itemsets, max_cluster_itemsets))
+            else:
+                index = similarity.AncestorIndex(metadata)
+                rules = similarity.cluster_rules(rules, index, measure = rule_similarity, threshold = cluster_threshold,
+                    max_itemsets = max_cluster_itemsets)
+                span.set(clusters = rules['cluster'].nunique())
+    with tracer.span("export", rules = len(rules)):
+        if output_backend == "sqlite":
+            rulestore.save_rule_store(rules_db, rules, itemsets)
+        else:
+            mining.save_rules([mining.format_rules(rules)], "rules.%s" % output_backend)
 
-itemsets = fpgrowth(df, min_support = 0.25, max_len = 2, use_colnames = True)
-rules = association_rules(itemsets)
-rules["antecedents"] = rules["antecedents"].apply(lambda x: str_from_iterable(x))
-rules["consequents"] = rules["consequents"].apply(lambda x: str_from_iterable(x))
-rules.to_csv("rules.csv", index=False)
+if bitmaps_db and not out_of_core:
+    bitmap_genes, bitmap_transactions = list(gene_transactions.keys()), list(gene_transactions.values())
+    if contrast_genes:
+        # the genes of both lists, in the order they were mined, are prefixed with the list they belong to as a gene
+        # of both lists supports the patterns in each of them
+        bitmap_genes = ["a:%s" % gene for gene in bitmap_genes] + ["b:%s" % gene for gene in contrast_transactions]
+        bitmap_transactions = bitmap_transactions + list(contrast_transactions.values())
+        bitmap_itemsets = patterns['itemsets']
+    elif weighted:
+        bitmap_itemsets = patterns['pattern']
+    else:
+        bitmap_itemsets = itemsets['itemsets']
+    with tracer.span("bitmaps", genes = len(bitmap_genes), itemsets = len(bitmap_itemsets)):
+        bitmap.save_bitmaps(bitmaps_db, bitmap_genes, bitmap_transactions, bitmap_itemsets)
 
 # interest_isets = list()
 # for iset in itemsets:
@@ -98,11 +258,6 @@ rules.to_csv("rules.csv", index=False)
 #             interest_isets.append(iset)
 # print(len(interest_isets))
 
-end_min = tm.time()
+tracer.stop()
 
-print("\nitemset mining completed in %s seconds:\n \
-    .loading: %ss\n \
-    .mining: %ss\n" % (
-        (end_min - begin), 
-        (end_load - begin),
-        (end_min - end_load)))
\ No newline at end of file
+tracer.report("itemset mining")
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Serve the itemset mining of gene lists over a local HTTP API, with the data loaded once.
+See scripts/service.py for the API.
+"""
+
+from settings import *
+
+import time as tm
+import scripts.ontology as onto
+import scripts.enrichment as enrich
+import scripts.mining as mining
+import scripts.service as service
+
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+# - - - - - - - - -- - - - - - -- - - - - - -- - -- - - -- - -- - - -- - -- - -- - - -- - - -- - -  - - - -
+
+#_________________________________________ S E R V I C E __________________________________________
+
+#_________________________________________ L O A D I N G
+
+begin = tm.time()
+
+gene_index = mining.load_gene_index(rdy2use_path, species)
+
+anno_path = "%s/%s_gene_annotation.json" % (rdy2use_path, species)
+annotation = mining.load_annotation(anno_path)
+
+pruned_terms = onto.get_pruned_ids(mining.load_term_metadata(rdy2use_path, species, hpo_obo_file), pruning_rules)
+
+background = None
+if enrichment:
+    background = enrich.load_background("%s/%s_background.npz" % (rdy2use_path, species), anno_path)
+
+defaults = {
+    'min_support': min_support,
+    'max_len': max_len,
+    'metric': metric,
+    'min_threshold': min_threshold,
+    'symbol': symbol}
+mining_service = service.MiningService(annotation, pruned_terms, gene_index, background,
+    defaults = defaults, cache_size = cache_size)
+
+end_load = tm.time()
+
+#_________________________________________ S E R V I N G
+
+server = service.serve(mining_service, service_host, service_port)
+print("\nservice loaded in %ss, listening on http://%s:%s\n" % (
+    (end_load - begin), server.server_address[0], server.server_address[1]))
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
@@ -0,0 +1,267 @@
+"""
+Compressed bitmaps of the genes supporting each itemset, stored next to the rules.
+
+Roaring bitmaps:
+Daniel Lemire, Gregory Ssi-Yan-Kai, Owen Kaser (2016).
+Consistently faster and smaller compressed bitmaps with Roaring.
+Software: Practice and Experience.
+DOI:10.1002/spe.2402
+
+The genes of the list are numbered and the supporting genes of an itemset are the intersection of the gene
+bitsets of its terms (see common.get_item_bitsets). As in Roaring,
+each bitmap is stored in the smallest of three containers: the sorted positions of its genes (array), its
+raw bits (bitmap) or its runs of consecutive genes (run). The bitmaps are written in batches to an indexed
+SQLite file and only decoded on request, so that the genes of a rule, or the overlap of two rules, are
+found without scanning the transactions again nor loading all the bitmaps in memory.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import sqlite3
+import numpy as np
+import scripts.common as cmn
+
+# lowercase kinds store 16 bits positions, uppercase kinds 32 bits positions
+KINDS = [b"a", b"b", b"r", b"A", b"R"]
+
+def get_itemset_key(itemset):
+    """
+    # Description
+    Returns the terms of an itemset sorted and joined by commas, the key of its bitmap.
+
+    # Arguments
+    ``itemset`` (iterable of strings, or string): the terms, or comma separated terms.
+
+    # Usage
+    >>> print(get_itemset_key(frozenset(["R-HSA-168256", "GO:0006955"])))
+    ... GO:0006955,R-HSA-168256
+    """
+    if isinstance(itemset, str):
+        itemset = itemset.split(",")
+    return ",".join(sorted(set(itemset)))
+
+def get_positions(bits):
+    """Returns the sorted positions of the bits set in a bitset."""
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype = np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder = "little"))
+
+def from_positions(positions):
+    """Returns the bitset with the bits set at the given positions."""
+    if len(positions) == 0:
+        return 0
+    flags = np.zeros(int(positions.max()) + 1, dtype = np.uint8)
+    flags[positions] = 1
+    return int.from_bytes(np.packbits(flags, bitorder = "little").tobytes(), "little")
+
+def encode(bits):
+    """
+    # Description
+    Returns a bitset in the smallest of the array, bitmap and run containers, prefixed with the kind of container.
+
+    # Arguments
+    ``bits`` (int): the bitset.
+
+    # Usage
+    >>> print(encode(0b11110001), encode(1 << 900 | 1))
+    ... b'b\\xf1' b'a\\x00\\x00\\x84\\x03'
+    """
+    positions = get_positions(bits)
+    if len(positions) == 0:
+        return b"a"
+    wide = bits.bit_length() > 1 << 16
+    dtype = np.uint32 if wide else np.uint16
+    # starts and lengths of the runs of consecutive positions, the lengths stored minus one as in Roaring so that
+    # a run of 65536 positions fits in 16 bits
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    starts = positions[np.r_[0, breaks]]
+    lengths = np.diff(np.r_[0, breaks, len(positions)]) - 1
+    containers = [
+        (b"A" if wide else b"a") + positions.astype(dtype).tobytes(),
+        b"b" + bits.to_bytes((bits.bit_length() + 7) // 8, "little"),
+        (b"R" if wide else b"r") + np.column_stack((starts, lengths)).astype(dtype).tobytes()]
+    return min(containers, key = len)
+
+def decode(data):
+    """
+    # Description
+    Returns the bitset stored in a container written by encode.
+
+    # Arguments
+    ``data`` (bytes): the container.
+
+    # Usage
+    >>> print(bin(decode(encode(0b11110001))))
+    ... 0b11110001
+    """
+    kind, body = data[:1], data[1:]
+    if kind not in KINDS:
+        raise ValueError("unknown bitmap container %s" % kind)
+    if kind == b"b":
+        return int.from_bytes(body, "little")
+    values = np.frombuffer(body, dtype = np.uint16 if kind.islower() else np.uint32).astype(np.int64)
+    if kind in (b"a", b"A"):
+        return from_positions(values)
+    starts, lengths = values[0::2], values[1::2] + 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return from_positions(np.repeat(starts, lengths) + offsets)
+
+def save_bitmaps(filename, genes, transactions, itemsets, batch_size = 50000):
+    """
+    # Description
+    Writes the compressed bitmaps of the genes supporting each itemset to an indexed SQLite file.
+
+    # Arguments
+    ``filename`` (string): the name of the SQLite file. Its bitmaps tables are overwritten, the other ones kept. \n
+    ``genes`` (list): the ids of the genes, in the order of their transactions. \n
+    ``transactions`` (list of lists): the terms of each gene. \n
+    ``itemsets`` (iterable): the itemsets, as iterables of terms. \n
+    ``batch_size`` (int): the number of bitmaps written per transaction.
+
+    # Usage
+    >>> save_bitmaps("bitmaps.sqlite", list(gene_transactions.keys()), list(gene_transactions.values()),
+            itemsets['itemsets'])
+    """
+    item_bits = cmn.get_item_bitsets(transactions)
+    everyone = (1 << len(transactions)) - 1
+    con = sqlite3.connect(filename)
+    con.executescript("""
+        DROP TABLE IF EXISTS bitmap_genes;
+        DROP TABLE IF EXISTS bitmaps;
+        CREATE TABLE bitmap_genes (position INTEGER PRIMARY KEY, id TEXT);
+        CREATE TABLE bitmaps (itemset TEXT PRIMARY KEY, length INTEGER, count INTEGER, bitmap BLOB);
+        """)
+    with con:
+        con.executemany("INSERT INTO bitmap_genes VALUES (?, ?)", enumerate(genes))
+
+    def write(rows):
+        with con:
+            con.executemany("INSERT OR REPLACE INTO bitmaps VALUES (?, ?, ?, ?)", rows)
+
+    rows = []
+    for itemset in itemsets:
+        key = get_itemset_key(itemset)
+        terms = key.split(",")
+        bits = everyone
+        for t_id in terms:
+            bits &= item_bits.get(t_id, 0)
+        rows.append((key, len(terms), bits.bit_count(), encode(bits)))
+        if len(rows) == batch_size:
+            write(rows)
+            rows = []
+    write(rows)
+    con.close()
+    print("WROTE: %s" % filename)
+
+class BitmapStore:
+    """
+    Queries on the supporting genes of the itemsets and rules of a SQLite file written by save_bitmaps.
+    """
+
+    def __init__(self, filename):
+        """
+        ``filename``: the name of the SQLite file. \n
+        ``genes``: the ids of the genes, by position.
+        """
+        self.filename = filename
+        self._con = sqlite3.connect(filename)
+        self.genes = [row[0] for row in self._con.execute("SELECT id FROM bitmap_genes ORDER BY position")]
+
+    def close(self):
+        """Closes the connection to the store."""
+        self._con.close()
+
+    def get_bitmap(self, itemset):
+        """
+        # Description
+        Returns the bitset of the genes supporting an itemset, None if the itemset is not stored.
+
+        # Arguments
+        ``itemset`` (iterable of strings, or string): the terms, or comma separated terms.
+        """
+        row = self._con.execute("SELECT bitmap FROM bitmaps WHERE itemset = ?", (get_itemset_key(itemset),)).fetchone()
+        return None if row is None else decode(row[0])
+
+    def get_genes(self, itemset):
+        """
+        # Description
+        Returns the ids of the genes supporting an itemset.
+
+        # Arguments
+        ``itemset`` (iterable of strings, or string): the terms, or comma separated terms.
+
+        # Usage
+        >>> store = BitmapStore("bitmaps.sqlite")
+        >>> print(store.get_genes("GO:0006955,R-HSA-168256"))
+        ... ['P01584', 'P05231', 'P10145']
+        """
+        bits = self.get_bitmap(itemset)
+        if bits is None:
+            raise KeyError("itemset %s is not stored" % get_itemset_key(itemset))
+        return [self.genes[i] for i in get_positions(bits)]
+
+    def get_rule_genes(self, antecedents, consequents):
+        """
+        # Description
+        Returns the ids of the genes supporting a rule, i.e. the union of its antecedents and consequents.
+
+        # Arguments
+        ``antecedents``, ``consequents`` (iterables of strings, or strings): the terms of each side of the rule.
+
+        # Usage
+        >>> rules = pd.read_csv("rules.csv")
+        >>> print(store.get_rule_genes(rules['antecedents'][0], rules['consequents'][0]))
+        ... ['P01584', 'P05231']
+        """
+        return self.get_genes(get_itemset_key(antecedents).split(",") + get_itemset_key(consequents).split(","))
+
+    def get_overlap(self, itemset_a, itemset_b):
+        """
+        # Description
+        Returns the number of genes supporting both itemsets and the Jaccard index of their supporting genes.
+
+        # Arguments
+        ``itemset_a``, ``itemset_b`` (iterables of strings, or strings): the terms of each itemset.
+
+        # Usage
+        >>> print(store.get_overlap("GO:0006955,R-HSA-168256", "GO:0002376"))
+        ... (3, 0.25)
+        """
+        bits = []
+        for itemset in (itemset_a, itemset_b):
+            bits.append(self.get_bitmap(itemset))
+            if bits[-1] is None:
+                raise KeyError("itemset %s is not stored" % get_itemset_key(itemset))
+        shared, union = (bits[0] & bits[1]).bit_count(), (bits[0] | bits[1]).bit_count()
+        return shared, shared / union if union else 0.0
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import scripts.wofptree as wofp
+
+    # the genes of the weighted patterns are found back from their terms, as written to weighted_patterns.csv
+    rng = random.Random(0)
+    items = ["GO:%07d" % i for i in range(20)] + ["HP:%07d" % i for i in range(10)] + ["R-HSA-%d" % i for i in range(10)]
+    genes = ["P%05d" % k for k in range(200)]
+    trans = [rng.sample(items, rng.randint(1, 8)) for _ in genes]
+    w_items = dict((item, rng.random()) for item in items)
+    freq_items, weight_trans = wofp.get_frequency_and_weight(trans, w_items, min_sup = 0.1)
+    tree, item_nodes = wofp.construct_fptree(trans, freq_items, weight_trans)
+    patterns = wofp.get_association_rules(tree, item_nodes, min_weight = 0.01)
+
+    filename = os.path.join(tempfile.mkdtemp(), "bitmaps.sqlite")
+    save_bitmaps(filename, genes, trans, patterns.keys())
+    store = BitmapStore(filename)
+    for pattern in patterns.keys():
+        expected = [gene for gene, t in zip(genes, trans) if set(pattern).issubset(t)]
+        assert expected and store.get_genes(",".join(pattern)) == expected
+        assert store.get_rule_genes(pattern[0], pattern[1]) == expected
+    store.close()
+    print("%s weighted patterns found back with their genes" % len(patterns))
+
+    # the runs as long as a 16 bits container, or longer
+    for bits in [(1 << 65536) - 1, (1 << 65537) - 1, ((1 << 65536) - 1) << 3, (1 << 70000) - 1 ^ (1 << 65536)]:
+        assert decode(encode(bits)) == bits
+    print("runs of 65536 genes found back")
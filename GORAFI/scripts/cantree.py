@@ -0,0 +1,362 @@
+"""
+Incremental FP-tree (CanTree) keeping the transactions of a gene list in a fixed canonical item order.
+
+CanTree:
+Carson Kai-Sang Leung, Quamrul I. Khan, Zhan Li, Tariqul Hoque (2007).
+CanTree: a canonical-order tree for incremental frequent-pattern mining.
+Knowledge and Information Systems.
+DOI:10.1007/s10115-006-0032-8
+
+Pre-large itemsets:
+Tzung-Pei Hong, Ching-Yao Wang, Yu-Hui Tao (2001).
+A new incremental data mining algorithm using pre-large itemsets.
+Intelligent Data Analysis.
+DOI:10.3233/IDA-2001-5203
+
+The order of the items never depends on their frequencies, so genes can be inserted or deleted
+without restructuring the tree. The itemsets mined at a slightly lower support (pre-large) have
+their counts updated on every insertion or deletion, so small edits of a gene list are answered
+without mining the tree again.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import os
+import pickle
+import pandas as pd
+from collections import Counter
+
+class CanNode:
+    """
+    Node of a CanTree.
+    """
+
+    def __init__(self, item, parent):
+        """
+        ``item``: the item stored on the node. \n
+        ``parent``: the parent CanNode, None for the root. \n
+        ``count``: the number of transactions going through the node. \n
+        ``children``: the children CanNodes with their items as keys.
+        """
+        self.item = item
+        self.parent = parent
+        self.count = 0
+        self.children = {}
+
+    def get_prefix(self):
+        """Returns the items on the path from the root to the node, excluded, in canonical order."""
+        prefix = []
+        node = self.parent
+        while node.parent is not None:
+            prefix.append(node.item)
+            node = node.parent
+        return tuple(reversed(prefix))
+
+class CanTree:
+    """
+    FP-tree with a canonical item order, updated one transaction at a time.
+    """
+
+    def __init__(self, order = None):
+        """
+        ``order``: a dict with the items as keys and their canonical rank as values.
+        Items are sorted by name if None, unranked items come after the ranked ones. \n
+        ``root``: the root CanNode. \n
+        ``header``: the items and the set of their nodes. \n
+        ``trans``: the transactions ids and their ordered items. \n
+        ``tracked``: the pre-large itemsets and their counts, kept up to date. \n
+        ``tracked_params``: the minimum support, maximum length and minimum count the itemsets were tracked with. \n
+        ``edits``: the number of insertions and deletions since the itemsets were tracked.
+        """
+        self.order = order
+        self.root = CanNode(None, None)
+        self.header = {}
+        self.trans = {}
+        self.tracked = {}
+        self.tracked_params = None
+        self.edits = {'insert': 0, 'delete': 0}
+
+    def __len__(self):
+        """Returns the number of transactions."""
+        return len(self.trans)
+
+    def __getstate__(self):
+        """Flattens the tree into lists of nodes so that deep trees can be pickled."""
+        items, parents, counts = [], [], []
+        node_ids = {self.root: -1}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for child in node.children.values():
+                node_ids[child] = len(items)
+                items.append(child.item)
+                parents.append(node_ids[node])
+                counts.append(child.count)
+                stack.append(child)
+        state = dict(self.__dict__)
+        del state['root'], state['header']
+        state['nodes'] = (items, parents, counts)
+        return state
+
+    def __setstate__(self, state):
+        """Rebuilds the nodes and the header table from the flattened tree."""
+        items, parents, counts = state.pop('nodes')
+        self.__dict__.update(state)
+        self.root = CanNode(None, None)
+        self.header = {}
+        nodes = []
+        for item, parent, count in zip(items, parents, counts):
+            parent_node = self.root if parent == -1 else nodes[parent]
+            node = CanNode(item, parent_node)
+            node.count = count
+            parent_node.children[item] = node
+            self.header.setdefault(item, set()).add(node)
+            nodes.append(node)
+
+    def get_rank(self, item):
+        """Returns the canonical sorting key of an item."""
+        if self.order is None:
+            return item
+        return (self.order.get(item, len(self.order)), item)
+
+    def sort_items(self, items):
+        """Returns the distinct items of a transaction in canonical order."""
+        return tuple(sorted(set(items), key = self.get_rank))
+
+    def insert(self, tid, items):
+        """
+        # Description
+        Inserts a transaction in the tree. A transaction with the same id is deleted first.
+
+        # Arguments
+        ``tid`` (string): the transaction id, e.g. a UniProtKB ID. \n
+        ``items`` (iterable): the items of the transaction.
+
+        # Usage
+        >>> tree = CanTree()
+        >>> tree.insert("P08069", ["GO:0008283", "R-HSA-2404192"])
+        """
+        if tid in self.trans:
+            self.delete(tid)
+        items = self.sort_items(items)
+        self.trans[tid] = items
+        node = self.root
+        for item in items:
+            try:
+                node = node.children[item]
+            except KeyError:
+                child = CanNode(item, node)
+                node.children[item] = child
+                self.header.setdefault(item, set()).add(child)
+                node = child
+            node.count += 1
+        self.update_tracked(items, 1)
+        self.edits['insert'] += 1
+
+    def delete(self, tid):
+        """
+        # Description
+        Deletes a transaction from the tree, removing the nodes no other transaction goes through.
+
+        # Arguments
+        ``tid`` (string): the transaction id.
+
+        # Usage
+        >>> tree.delete("P08069")
+        """
+        items = self.trans.pop(tid)
+        node = self.root
+        for item in items:
+            child = node.children[item]
+            child.count -= 1
+            if child.count == 0:
+                # the whole branch below is only used by this transaction
+                del node.children[item]
+                stack = [child]
+                while stack:
+                    dead = stack.pop()
+                    self.header[dead.item].discard(dead)
+                    if not self.header[dead.item]:
+                        del self.header[dead.item]
+                    stack.extend(dead.children.values())
+                break
+            node = child
+        self.update_tracked(items, -1)
+        self.edits['delete'] += 1
+
+    def update_tracked(self, items, delta):
+        """Adds delta to the counts of the tracked itemsets included in a transaction."""
+        if not self.tracked:
+            return
+        items = set(items)
+        for itemset in self.tracked.keys():
+            if itemset.issubset(items):
+                self.tracked[itemset] += delta
+
+    def get_count(self, itemset):
+        """
+        # Description
+        Returns the number of transactions including an itemset, by walking up from the nodes of
+        its last item in canonical order.
+
+        # Arguments
+        ``itemset`` (iterable): the items.
+
+        # Usage
+        >>> print(tree.get_count(["GO:0008283", "R-HSA-2404192"]))
+        ... 1
+        """
+        items = self.sort_items(itemset)
+        if not items:
+            return len(self.trans)
+        others = set(items[:-1])
+        count = 0
+        for node in self.header.get(items[-1], ()):
+            if others.issubset(node.get_prefix()):
+                count += node.count
+        return count
+
+    def mine(self, min_count, max_len = None, min_counts = None):
+        """
+        # Description
+        Returns a dict with the itemsets reaching a minimum count as keys and their counts as values.
+
+        # Arguments
+        ``min_count`` (int): the minimum number of transactions including an itemset. \n
+        ``max_len`` (int): the maximum length of the itemsets. \n
+        ``min_counts`` (dict): items and their own minimum count, applying instead of ``min_count`` to the itemsets
+        they are the last item of in canonical order. The canonical order must rank the items by decreasing
+        minimum count, so that the minimum count of an itemset is the lowest one of its items.
+
+        # Usage
+        >>> print(tree.mine(1, max_len = 2))
+        ... {frozenset({'GO:0008283'}): 1, frozenset({'R-HSA-2404192'}): 1, frozenset({'GO:0008283', 'R-HSA-2404192'}): 1}
+        """
+        itemsets = {}
+        for item in sorted(self.header.keys(), key = self.get_rank):
+            nodes = self.header[item]
+            count = sum(node.count for node in nodes)
+            # the items of the prefixes come first in canonical order
+            item_min_count = min_count if min_counts is None else min_counts.get(item, min_count)
+            if count < item_min_count:
+                continue
+            itemsets[frozenset([item])] = count
+            if max_len is None or max_len > 1:
+                base = [(node.get_prefix(), node.count) for node in nodes]
+                mine_pattern_base(base, (item,), item_min_count, max_len, itemsets)
+        return itemsets
+
+    def get_itemsets(self, min_support, max_len = None, slack = 0.1):
+        """
+        # Description
+        Returns the frequent itemsets of the tree as a data frame, like mlxtend's fpgrowth with ``use_colnames = True``. \n
+        The itemsets with a support above ``min_support * (1 - slack)`` are tracked, so the tree is mined
+        again only when the insertions since then might have made an untracked itemset frequent.
+
+        # Arguments
+        ``min_support`` (float): the minimum support of the itemsets. 0 < min_support <= 1. \n
+        ``max_len`` (int): the maximum length of the itemsets. \n
+        ``slack`` (float): the relative support margin of the tracked itemsets. 0 <= slack < 1.
+
+        # Usage
+        >>> itemsets = tree.get_itemsets(0.25, max_len = 2)
+        >>> rules = association_rules(itemsets)
+        """
+        n_trans = len(self.trans)
+        min_count = min_support * n_trans
+        safe = False
+        if self.tracked_params is not None and self.tracked_params[:2] == (min_support, max_len):
+            # an untracked itemset had at most low_count - 1 transactions and gained at most one per insertion
+            low_count = self.tracked_params[2]
+            safe = low_count - 1 + self.edits['insert'] < min_count
+        if not safe:
+            low_count = max(1, int(min_support * (1 - slack) * n_trans))
+            self.tracked = self.mine(low_count, max_len)
+            self.tracked_params = (min_support, max_len, low_count)
+            self.edits = {'insert': 0, 'delete': 0}
+
+        itemsets = [(count, items) for items, count in self.tracked.items() if count >= min_count and count > 0]
+        itemsets.sort(key = lambda x: (len(x[1]), sorted(self.get_rank(i) for i in x[1])))
+        return pd.DataFrame({
+            'support': [count / n_trans for count, _ in itemsets],
+            'itemsets': [items for _, items in itemsets]})
+
+def mine_pattern_base(base, suffix, min_count, max_len, itemsets):
+    """
+    # Description
+    Adds the frequent itemsets ending with a suffix to a dict, by growing the suffix with the items
+    of its conditional pattern base.
+
+    # Arguments
+    ``base`` (list of tuples): the prefix paths (in canonical order) and their counts. \n
+    ``suffix`` (tuple): the items the base is conditioned on. \n
+    ``min_count`` (int): the minimum number of transactions including an itemset. \n
+    ``max_len`` (int): the maximum length of the itemsets. \n
+    ``itemsets`` (dict): the frequent itemsets found so far and their counts.
+    """
+    counts = Counter()
+    for path, count in base:
+        for item in path:
+            counts[item] += count
+    for item in counts.keys():
+        if counts[item] < min_count:
+            continue
+        itemset = suffix + (item,)
+        itemsets[frozenset(itemset)] = counts[item]
+        if max_len is None or len(itemset) < max_len:
+            cond_base = [(path[:path.index(item)], count) for path, count in base if item in path]
+            mine_pattern_base(cond_base, itemset, min_count, max_len, itemsets)
+
+def sync_transactions(tree, transactions):
+    """
+    # Description
+    Updates a tree so that it holds exactly the given transactions: transactions that are new or
+    whose items changed are inserted, transactions that disappeared are deleted.
+
+    # Arguments
+    ``tree`` (CanTree): the tree of the previous gene list. \n
+    ``transactions`` (dict): the transactions ids and their items.
+
+    # Usage
+    >>> sync_transactions(tree, {"P08069": ["GO:0008283", "R-HSA-2404192"], "P05019": ["GO:0008283"]})
+    """
+    for tid in set(tree.trans.keys()).difference(transactions.keys()):
+        tree.delete(tid)
+    for tid in transactions.keys():
+        items = tree.sort_items(transactions[tid])
+        if tree.trans.get(tid) != items:
+            tree.insert(tid, items)
+
+def load_cantree(filename, order = None):
+    """
+    # Description
+    Returns the CanTree saved in a file, or an empty one if the file does not exist.
+
+    # Arguments
+    ``filename`` (string): the path of the pickled tree. \n
+    ``order`` (dict): the canonical order of an empty tree.
+
+    # Usage
+    >>> tree = load_cantree("data/rdy2use/gene_list.cantree")
+    """
+    if not os.path.exists(filename):
+        return CanTree(order)
+    with open(filename, 'rb') as ct:
+        return pickle.load(ct)
+
+def save_cantree(tree, filename):
+    """
+    # Description
+    Saves a CanTree in a file.
+
+    # Arguments
+    ``tree`` (CanTree): the tree. \n
+    ``filename`` (string): the path of the pickled tree.
+
+    # Usage
+    >>> save_cantree(tree, "data/rdy2use/gene_list.cantree")
+    """
+    with open(filename, 'wb') as ct:
+        pickle.dump(tree, ct)
+    print("WROTE: %s" % filename)
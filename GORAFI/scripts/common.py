@@ -108,6 +108,8 @@ def save_as_json(dictio, filename):
         def default(self, obj):
             if isinstance(obj, set):
                 return list(obj)
+            if hasattr(obj, "__slots__"):
+                return dict((k, getattr(obj, k)) for k in obj.__slots__)
             try:
                 return obj.__dict__
             except AttributeError:
@@ -150,3 +152,107 @@ def record_iterator(handle, fields):
     for inline in handle:
         inrec = inline.rstrip("\n").split("\t")
         yield dict(zip(fields, inrec))
+
+def iter_json_items(handle, chunk_size = 1 << 16):
+    """
+    # Description
+    Iterate over the (key, value) pairs of a JSON object stored in a file, without loading the whole file.
+
+    # Arguments
+    ``handle``: a handle corresponding to an open text file containing a JSON object. \n
+    ``chunk_size`` (int): the number of characters read at once.
+
+    # Usage
+    >>> with open("data/rdy2use/human_gene_annotation.json", 'rt') as jn:
+        for gene_id, gene_anno in iter_json_items(jn):
+            print(gene_id, len(gene_anno['GO']))
+    ... P08069 270
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def skip(buffer, pos, chars):
+        while pos < len(buffer) and buffer[pos] in chars:
+            pos += 1
+        return pos
+
+    # go to the opening brace
+    while True:
+        pos = skip(buffer, pos, " \t\r\n")
+        if pos < len(buffer):
+            break
+        buffer, pos = handle.read(chunk_size), 0
+        if not buffer:
+            return
+    if buffer[pos] != "{":
+        raise ValueError("the file does not contain a JSON object")
+    pos += 1
+
+    while True:
+        try:
+            start = skip(buffer, pos, " \t\r\n,")
+            if buffer[start] == "}":
+                return
+            key, end = decoder.raw_decode(buffer, start)
+            end = skip(buffer, end, " \t\r\n")
+            if buffer[end] != ":":
+                raise ValueError("expected ':' after key %s" % key)
+            value, end = decoder.raw_decode(buffer, skip(buffer, end + 1, " \t\r\n"))
+            # the value is only complete if something follows it
+            if skip(buffer, end, " \t\r\n") >= len(buffer):
+                raise IndexError
+        except (IndexError, json.JSONDecodeError):
+            if eof:
+                raise ValueError("the JSON object is truncated")
+            chunk = handle.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield key, value
+        pos = end
+
+def load_gmt(gmt_path):
+    """
+    # Description
+    Returns a dictionary with the names of the gene sets of a GMT file as keys and their genes as values. \n
+    A GMT line holds the name of a gene set, its description and its genes, separated by tabs.
+
+    # Arguments
+    ``gmt_path`` (string): path leading to the GMT file.
+
+    # Usage
+    >>> gene_sets = load_gmt("signatures.gmt")
+    >>> print(gene_sets['INTERFERON_RESPONSE'][:3])
+    ... ['LY6E', 'IFIT1', 'OAS1']
+    """
+    gene_sets = {}
+    with open(gmt_path, 'rt') as gmt:
+        for inline in gmt:
+            inrec = inline.rstrip("\n").split("\t")
+            if len(inrec) < 3:
+                continue
+            gene_sets[inrec[0]] = [gene for gene in inrec[2:] if gene]
+    return gene_sets
+
+def get_item_bitsets(transactions):
+    """
+    # Description
+    Returns a dict with the items as keys and, as values, the bitsets of the transactions including them:
+    Python integers whose bit k is set when the k-th transaction includes the item. The transactions
+    including an itemset are then found by intersecting the bitsets of its items, and counted with bit_count.
+
+    # Arguments
+    ``transactions`` (list of lists): the items of each transaction, e.g. the terms of each gene.
+
+    # Usage
+    >>> print(get_item_bitsets([["GO:1", "R-1"], ["GO:1"], ["R-1"]]))
+    ... {'GO:1': 3, 'R-1': 5}
+    """
+    bitsets = {}
+    for bit, trans in enumerate(transactions):
+        for item in set(trans):
+            bitsets[item] = bitsets.get(item, 0) | (1 << bit)
+    return bitsets
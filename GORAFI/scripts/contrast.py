@@ -0,0 +1,114 @@
+"""
+Contrast (emerging) patterns of two gene lists, mined in a single pass.
+
+Emerging patterns:
+Guozhu Dong, Jinyan Li (1999).
+Efficient mining of emerging patterns: discovering trends and differences.
+Proceedings of the fifth ACM SIGKDD international conference on Knowledge discovery and data mining.
+DOI:10.1145/312129.312191
+
+Eclat:
+Mohammed J. Zaki (2000).
+Scalable algorithms for association mining.
+IEEE Transactions on Knowledge and Data Engineering.
+DOI:10.1109/69.846291
+
+The genes of both lists are numbered together, the genes of the first list first, so that each term holds a
+single set of genes over both lists. Extending a pattern intersects two of these sets, and its supports in the
+two lists are the number of genes kept under the mask of each list.
+The supports only decrease when a pattern is extended, so a pattern whose supports are both lower than the
+minimum support and the minimum difference cannot lead to a contrast pattern and is not extended.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import numpy as np
+import pandas as pd
+import scripts.common as cmn
+
+RANKS = ["difference", "growth"]
+
+def mine_contrast_patterns(trans_a, trans_b, min_support = 0.25, min_difference = 0.2, min_growth = 2,
+                           max_len = 2, rank = "difference"):
+    """
+    # Description
+    Returns the patterns of terms whose supports differ between two gene lists, as a table with the
+    ``itemsets``, their ``support_a`` and ``support_b`` in each list, their ``difference`` (support_a - support_b),
+    their ``growth_rate`` (highest support over lowest support, infinite if the lowest is 0) and the list they
+    are ``enriched`` in ("a" or "b"), sorted by decreasing absolute difference or growth rate. \n
+    A contrast pattern reaches the minimum support in the list it is enriched in, the minimum difference and the
+    minimum growth rate.
+
+    # Arguments
+    ``trans_a``, ``trans_b`` (lists of lists): the terms of the genes of each list. \n
+    ``min_support`` (float): the minimum support of a pattern in the list it is enriched in. \n
+    ``min_difference`` (float): the minimum absolute difference between the supports of a pattern. \n
+    ``min_growth`` (float): the minimum growth rate of a pattern. \n
+    ``max_len`` (int): the maximum length of the patterns. \n
+    ``rank`` (string): the metric the patterns are sorted by, "difference" or "growth".
+
+    # Usage
+    >>> patterns = mine_contrast_patterns(up_transactions, down_transactions, min_support = 0.25)
+    >>> print(patterns.iloc[0])
+    ... itemsets       (GO:0006955, R-HSA-168256)
+        support_a                        0.62
+        support_b                        0.08
+        difference                       0.54
+        growth_rate                      7.75
+        enriched                            a
+    """
+    if rank not in RANKS:
+        raise ValueError("unknown rank %s, expected one of %s" % (rank, RANKS))
+    n_a, n_b = max(len(trans_a), 1), max(len(trans_b), 1)
+    bitsets = cmn.get_item_bitsets(list(trans_a) + list(trans_b))
+    mask_a = (1 << len(trans_a)) - 1
+    mask_b = ((1 << len(trans_b)) - 1) << len(trans_a)
+    # a pattern is extended while one of its supports can still reach both thresholds
+    bound = max(min_support, min_difference)
+    count_a, count_b = bound * n_a, bound * n_b
+
+    def get_counts(bits):
+        return (bits & mask_a).bit_count(), (bits & mask_b).bit_count()
+
+    items = []
+    for item, bits in bitsets.items():
+        a, b = get_counts(bits)
+        if a >= count_a or b >= count_b:
+            items.append((item, bits, a, b))
+    # the least frequent items are extended first, as in Eclat
+    items.sort(key = lambda x: (x[2] + x[3], x[0]))
+
+    patterns = []
+    stack = [((), 0, -1, 0, 0)]
+    while stack:
+        prefix, bits, last, a, b = stack.pop()
+        if prefix:
+            patterns.append((prefix, a / n_a, b / n_b))
+            if max_len is not None and len(prefix) >= max_len:
+                continue
+        for i in range(last + 1, len(items)):
+            item, item_bits, item_a, item_b = items[i]
+            if prefix:
+                item_bits = bits & item_bits
+                item_a, item_b = get_counts(item_bits)
+                if item_a < count_a and item_b < count_b:
+                    continue
+            stack.append((prefix + (item,), item_bits, i, item_a, item_b))
+
+    support_a = np.array([a for _, a, _ in patterns], dtype = float)
+    support_b = np.array([b for _, _, b in patterns], dtype = float)
+    high, low = np.maximum(support_a, support_b), np.minimum(support_a, support_b)
+    growth = np.where(low > 0, high / np.where(low > 0, low, 1), np.inf)
+    # the differences are rounded to ignore floating point errors
+    kept = (high >= min_support) & (np.round(high - low, 12) >= min_difference) & (growth >= min_growth)
+    result = pd.DataFrame({
+        'itemsets': [frozenset(p) for p, _, _ in patterns],
+        'support_a': support_a,
+        'support_b': support_b,
+        'difference': support_a - support_b,
+        'growth_rate': growth,
+        'enriched': np.where(support_a >= support_b, "a", "b")})[kept]
+    key = result['difference'].abs() if rank == "difference" else result['growth_rate']
+    order = np.argsort(-key.to_numpy(), kind = 'stable')
+    return result.iloc[order].reset_index(drop = True)
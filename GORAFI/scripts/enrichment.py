@@ -0,0 +1,151 @@
+"""
+Enrichment of the association rules against all the annotated genes of a species.
+
+The background is a sparse genes x terms incidence matrix built once per species. The number of
+background genes annotated by the terms of every rule is obtained with one sparse product, and the
+over-representation of the rules in the gene list is tested with the hypergeometric distribution
+(one-sided Fisher's exact test) in a single vectorized call.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import os
+import json
+import numpy as np
+import scipy.sparse as sp
+import scripts.stats as st
+from scipy.stats import hypergeom
+
+def get_background(annotation):
+    """
+    # Description
+    Returns the background of a species: a dict with its genes ids (``genes``), its terms ids (``terms``)
+    and the sparse boolean matrix (``matrix``) of the genes annotated by each term.
+
+    # Arguments
+    ``annotation`` (dict): the genes ids and their terms per ontology, as in the rdy2use annotation file.
+
+    # Usage
+    >>> background = get_background(rdy2use_data)
+    >>> print(background['matrix'].shape)
+    ... (18424, 24917)
+    """
+    genes = list(annotation.keys())
+    terms = {}
+    rows, cols = [], []
+    for g, gene_id in enumerate(genes):
+        gene_terms = set(t_id for ids in annotation[gene_id].values() for t_id in ids)
+        for t_id in gene_terms:
+            rows.append(g)
+            cols.append(terms.setdefault(t_id, len(terms)))
+    matrix = sp.csc_matrix((np.ones(len(rows), dtype = bool), (rows, cols)), shape = (len(genes), len(terms)))
+    return {'genes': np.array(genes), 'terms': np.array(list(terms.keys())), 'matrix': matrix}
+
+def save_background(background, filename):
+    """
+    # Description
+    Saves the background of a species as a compressed .npz file.
+
+    # Arguments
+    ``background`` (dict): the background returned by get_background. \n
+    ``filename`` (string): the name of the .npz file.
+
+    # Usage
+    >>> save_background(get_background(rdy2use_data), "data/rdy2use/human_background.npz")
+    """
+    matrix = background['matrix']
+    np.savez_compressed(filename, genes = background['genes'], terms = background['terms'],
+        indices = matrix.indices, indptr = matrix.indptr, shape = matrix.shape)
+    print("WROTE: %s" % filename)
+
+def load_background(filename, anno_path = None):
+    """
+    # Description
+    Returns the background of a species saved as a .npz file. \n
+    If the file is missing or older than the annotation file, the background is built again and saved.
+
+    # Arguments
+    ``filename`` (string): the name of the .npz file. \n
+    ``anno_path`` (string): path leading to the rdy2use gene annotation JSON file.
+
+    # Usage
+    >>> background = load_background("data/rdy2use/human_background.npz", "data/rdy2use/human_gene_annotation.json")
+    """
+    if anno_path is not None:
+        if not os.path.exists(filename) or os.path.getmtime(filename) < os.path.getmtime(anno_path):
+            with open(anno_path, 'rt') as jn:
+                background = get_background(json.load(jn))
+            save_background(background, filename)
+            return background
+    with np.load(filename) as npz:
+        shape = tuple(npz['shape'])
+        data = np.ones(len(npz['indices']), dtype = bool)
+        return {
+            'genes': npz['genes'],
+            'terms': npz['terms'],
+            'matrix': sp.csc_matrix((data, npz['indices'], npz['indptr']), shape = shape)}
+
+def count_itemsets(background, itemsets):
+    """
+    # Description
+    Returns the number of background genes annotated by every term of each itemset.
+
+    # Arguments
+    ``background`` (dict): the background returned by get_background. \n
+    ``itemsets`` (list of iterables): the itemsets.
+
+    # Usage
+    >>> print(count_itemsets(background, [{"GO:0006955"}, {"GO:0006955", "R-HSA-168256"}]))
+    ... [1841  912]
+    """
+    term_index = dict((t_id, i) for i, t_id in enumerate(background['terms']))
+    rows, cols, lengths = [], [], np.zeros(len(itemsets), dtype = int)
+    for i, itemset in enumerate(itemsets):
+        for t_id in itemset:
+            rows.append(term_index.get(t_id, -1))
+            cols.append(i)
+            lengths[i] += 1
+    rows, cols = np.array(rows, dtype = int), np.array(cols, dtype = int)
+    # a term missing from the background annotates no gene
+    known = rows >= 0
+    incidence = sp.csc_matrix((np.ones(known.sum(), dtype = np.int32), (rows[known], cols[known])),
+        shape = (len(term_index), len(itemsets)))
+    # number of terms of each itemset annotating each gene
+    hits = (background['matrix'].astype(np.int32) @ incidence).tocsc()
+    hit_cols = np.repeat(np.arange(len(itemsets)), np.diff(hits.indptr))
+    complete = hits.data == lengths[hit_cols]
+    return np.bincount(hit_cols[complete], minlength = len(itemsets))
+
+def add_enrichment_pvalues(rules, background, n_genes):
+    """
+    # Description
+    Returns the rules with the support of their terms in the background (``background_support``),
+    their ``fold_enrichment``, and the hypergeometric ``enrichment_p_value`` and Benjamini-Hochberg
+    ``enrichment_q_value`` of their over-representation in the gene list.
+
+    # Arguments
+    ``rules`` (df): association rules from mlxtend, with frozensets of terms as antecedents and consequents. \n
+    ``background`` (dict): the background returned by get_background. \n
+    ``n_genes`` (int): the number of genes the rules were mined from.
+
+    # Usage
+    >>> rules = association_rules(itemsets)
+    >>> rules = add_enrichment_pvalues(rules, background, len(gene_transactions))
+    """
+    rules = rules.copy()
+    if rules.empty:
+        for column in ['background_support', 'fold_enrichment', 'enrichment_p_value', 'enrichment_q_value']:
+            rules[column] = []
+        return rules
+    n_background = background['matrix'].shape[0]
+    unions = [a | c for a, c in zip(rules['antecedents'], rules['consequents'])]
+    background_count = count_itemsets(background, unions)
+    support = rules['support'].to_numpy(dtype = float)
+    list_count = np.rint(support * n_genes)
+    rules['background_support'] = background_count / n_background
+    with np.errstate(divide = 'ignore'):
+        rules['fold_enrichment'] = support / rules['background_support'].to_numpy(dtype = float)
+    rules['enrichment_p_value'] = hypergeom.sf(list_count - 1, n_background, background_count, n_genes)
+    rules['enrichment_q_value'] = st.get_bh_qvalues(rules['enrichment_p_value'].values)
+    return rules
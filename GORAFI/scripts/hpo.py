@@ -19,24 +19,40 @@ HPO_ANNO_FIELDS = [
     'Disease_ID'
 ]
 
-def load_hpo_annotation(anno_path):
+def load_hpo_annotation(anno_path, gene_index = None):
     """
     # Description
-    Returns a dictionary with genes symbols as keys and their respective leaf HPO nodes as a set of values.
+    Returns a dictionary with genes UniProtKB IDs as keys and their respective leaf HPO nodes as a set of values. \n
+    The file is read once and its genes symbols are resolved on the fly with the resolution index; the
+    header and the records of unresolved symbols are skipped. Without index, the genes symbols are the keys.
 
     # Arguments
-    ``anno_path`` (string): path leading to the HPO annotation file.
+    ``anno_path`` (string): path leading to the HPO annotation file. \n
+    ``gene_index`` (df): the resolution index of the genes identifiers, see resolver.get_resolution_index.
 
     # Usage
-    >>> anno = load_hpo_annotation("data/raw/hpo_annotation.txt")
-    >>> print(len(anno['IGF1R'])) 
+    >>> anno = load_hpo_annotation("data/raw/hpo_annotation.txt", gene_index)
+    >>> print(len(anno['P08069']))
     ... 53
     """
     hpo_anno = {}
+    # UniProtKB IDs of the symbols already met, None if unresolved
+    gene_ids = {}
     with open(anno_path, 'rt') as ha:
         for rec in cmn.record_iterator(ha, HPO_ANNO_FIELDS):
+            # header, comments and blank lines
+            if not rec.get('HPO_Term_ID', "").startswith("HP:"):
+                continue
+            gene_id = rec['Gene_Symbol']
+            if gene_index is not None:
+                try:
+                    gene_id = gene_ids[gene_id]
+                except KeyError:
+                    gene_id = gene_ids[gene_id] = gene_index['id'].get(gene_id.strip().upper())
+                if gene_id is None:
+                    continue
             try:
-                hpo_anno[rec['Gene_Symbol']].add(rec['HPO_Term_ID'])
+                hpo_anno[gene_id].add(rec['HPO_Term_ID'])
             except KeyError:
-                hpo_anno[rec['Gene_Symbol']] = set([rec['HPO_Term_ID']])
+                hpo_anno[gene_id] = set([rec['HPO_Term_ID']])
     return hpo_anno
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+Named spans recording where the preparation and mining scripts spend their time and memory.
+
+A span records its wall and CPU time (including the worker processes it waited for), the maximum
+resident memory of the process, optionally the peak of the Python allocations traced with tracemalloc,
+and domain counters (records parsed, genes, terms, tree nodes, itemsets...). Spans can be nested,
+exported as JSON lines and profiled with cProfile.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import os
+import json
+import time
+import cProfile
+import resource
+import tracemalloc
+from contextlib import contextmanager
+
+class Span:
+    """
+    A measured stage of a script.
+    """
+
+    def __init__(self, name, parent = None, counters = None):
+        """
+        ``name``: name of the stage. \n
+        ``path``: names of the enclosing spans and of the stage, joined by slashes. \n
+        ``counters``: domain counters of the stage, e.g. {'genes': 18424}. \n
+        ``record``: measures of the stage once it is stopped.
+        """
+        self.name = name
+        self.path = name if parent is None else "%s/%s" % (parent.path, name)
+        self.counters = dict(counters or {})
+        self.record = None
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children_cpu = self.get_children_cpu()
+        self._traced_peak = 0
+        self._profiler = None
+
+    @staticmethod
+    def get_children_cpu():
+        """Returns the CPU time used by the terminated child processes."""
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def set(self, **counters):
+        """Sets domain counters of the stage."""
+        self.counters.update(counters)
+
+    def add(self, **counters):
+        """Increments domain counters of the stage."""
+        for k, v in counters.items():
+            self.counters[k] = self.counters.get(k, 0) + v
+
+    def __str__(self):
+        """Displays the path of the span only."""
+        return "Span('%s')" % self.path
+
+class Tracer:
+    """
+    Starts, stops and exports the spans of a script.
+    """
+
+    def __init__(self, filename = None, trace_memory = False, profile = (), profile_path = "./profiles"):
+        """
+        ``filename``: JSON lines file the stopped spans are appended to, None to keep them in memory only. \n
+        ``trace_memory``: trace the Python allocations to record the peak memory of each span. \n
+        ``profile``: names of the spans profiled with cProfile, or "all". \n
+        ``profile_path``: directory where the profiles are written as .prof files. \n
+        ``spans``: the stopped spans.
+        """
+        self.filename = filename
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.profile_path = profile_path
+        self.spans = []
+        self._stack = []
+        self._run = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self, name, **counters):
+        """
+        # Description
+        Starts a span nested in the current one and returns it.
+
+        # Arguments
+        ``name`` (string): the name of the stage. \n
+        ``counters``: the initial domain counters of the stage.
+
+        # Usage
+        >>> tracer = Tracer("spans.jsonl")
+        >>> span = tracer.start("loading")
+        >>> annotation = mining.load_annotation(anno_path)
+        >>> span.set(genes = len(annotation))
+        >>> tracer.stop(span)
+        """
+        parent = self._stack[-1] if self._stack else None
+        span = Span(name, parent, counters)
+        if self.trace_memory:
+            # the peak of the enclosing span is kept before measuring this one
+            if parent is not None:
+                parent._traced_peak = max(parent._traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        if self.profile == "all" or name in self.profile:
+            # a single profiler can be active at a time
+            if not any(s._profiler for s in self._stack):
+                span._profiler = cProfile.Profile()
+                span._profiler.enable()
+        self._stack.append(span)
+        return span
+
+    def stop(self, span = None):
+        """
+        # Description
+        Stops a span, by default the current one, with the spans nested in it, and returns its record.
+
+        # Arguments
+        ``span`` (Span): the span to stop.
+        """
+        span = span or self._stack[-1]
+        while self._stack[-1] is not span:
+            self.stop(self._stack[-1])
+        self._stack.pop()
+        record = {
+            'run': self._run,
+            'span': span.path,
+            'wall_seconds': round(time.perf_counter() - span._wall, 6),
+            'cpu_seconds': round(time.process_time() - span._cpu + Span.get_children_cpu() - span._children_cpu, 6),
+            # the maximum resident memory of the process since its start, in megabytes on Linux
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)}
+        if self.trace_memory:
+            peak = max(span._traced_peak, tracemalloc.get_traced_memory()[1])
+            record['traced_peak_mb'] = round(peak / 2**20, 2)
+            if self._stack:
+                self._stack[-1]._traced_peak = max(self._stack[-1]._traced_peak, peak)
+        if span._profiler is not None:
+            span._profiler.disable()
+            os.makedirs(self.profile_path, exist_ok = True)
+            profile_file = "%s/%s.prof" % (self.profile_path, span.path.replace("/", "-"))
+            span._profiler.dump_stats(profile_file)
+            record['profile'] = profile_file
+        record.update(span.counters)
+        span.record = record
+        self.spans.append(span)
+        if self.filename is not None:
+            with open(self.filename, 'at') as sf:
+                sf.write("%s\n" % json.dumps(record))
+        return record
+
+    @contextmanager
+    def span(self, name, **counters):
+        """
+        # Description
+        Measures the stage run in a with block.
+
+        # Arguments
+        ``name`` (string): the name of the stage. \n
+        ``counters``: the initial domain counters of the stage.
+
+        # Usage
+        >>> with tracer.span("fpgrowth", genes = len(transactions)) as span:
+        >>>     itemsets = mining.mine_itemsets(transactions)
+        >>>     span.set(itemsets = len(itemsets))
+        """
+        span = self.start(name, **counters)
+        try:
+            yield span
+        finally:
+            self.stop(span)
+
+    def report(self, title):
+        """
+        # Description
+        Prints the total time of a script and of its top level spans, with their counters.
+
+        # Arguments
+        ``title`` (string): what the script completed, e.g. "itemset mining".
+        """
+        while self._stack:
+            self.stop()
+        top = [s for s in self.spans if s.path == s.name]
+        lines = ["\n%s completed in %s seconds:" % (title, round(sum(s.record['wall_seconds'] for s in top), 6))]
+        for s in top:
+            counters = ", ".join("%s: %s" % (k, v) for k, v in s.counters.items())
+            lines.append("    .%s: %ss%s" % (s.name, s.record['wall_seconds'], " (%s)" % counters if counters else ""))
+        if self.filename is not None:
+            lines.append("WROTE: %s" % self.filename)
+        print("\n".join(lines) + "\n")
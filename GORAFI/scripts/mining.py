@@ -0,0 +1,380 @@
+"""
+Loading, encoding and mining steps shared by the itemset mining scripts.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import os
+import csv
+import json
+import numpy as np
+import pandas as pd
+from itertools import combinations
+import scripts.ontology as onto
+import scripts.termstore as termstore
+import scripts.resolver as resolver
+import scripts.enrichment as enrich
+from goatools import obo_parser
+from mlxtend.frequent_patterns import fpgrowth, association_rules
+from mlxtend.preprocessing.transactionencoder import TransactionEncoder
+
+# read-only data inherited by the worker processes of a batch:
+_shared = {}
+
+# columns of the rules, as returned by mlxtend's association_rules:
+RULE_COLUMNS = ["antecedents", "consequents", "antecedent support", "consequent support", "support", "confidence",
+    "lift", "representativity", "leverage", "conviction", "zhangs_metric", "jaccard", "certainty", "kulczynski"]
+
+def load_symbol_dict(symbol_path):
+    """
+    # Description
+    Returns a dictionary with genes symbols as keys and their UniProtKB IDs as values.
+
+    # Arguments
+    ``symbol_path`` (string): path leading to the rdy2use gene symbol CSV file.
+
+    # Usage
+    >>> gene_symbol_id_dict = load_symbol_dict("data/rdy2use/human_gene_symbol.csv")
+    >>> print(gene_symbol_id_dict['IGF1R'])
+    ... P08069
+    """
+    gene_symbol_id_dict = {}
+    with open(symbol_path, 'rt') as sc:
+        reader = csv.reader(sc)
+        # skip the header
+        next(reader, None)
+        for row in reader:
+            k, v = row
+            gene_symbol_id_dict[k] = v
+    return gene_symbol_id_dict
+
+def load_gene_index(rdy2use_path, species):
+    """
+    # Description
+    Returns the rdy2use resolution index of the genes identifiers of a species. \n
+    Data prepared without the index fall back on an index of their gene symbol CSV file.
+
+    # Arguments
+    ``rdy2use_path`` (string): path of the rdy2use data. \n
+    ``species`` (string): the species of interest.
+
+    # Usage
+    >>> gene_index = load_gene_index("./data/rdy2use", "human")
+    >>> genes = resolver.get_resolved_ids(resolver.resolve(gene_index, ["IGF1R", "JTK13"]))
+    """
+    filename = "%s/%s_gene_index.csv" % (rdy2use_path, species)
+    if os.path.exists(filename):
+        return resolver.load_resolution_index(filename)
+    gene_symbol_id_dict = load_symbol_dict("%s/%s_gene_symbol.csv" % (rdy2use_path, species))
+    records = [(k, "symbol", v) for k, v in gene_symbol_id_dict.items()]
+    records.extend((v, "accession", v) for v in set(gene_symbol_id_dict.values()))
+    return resolver.get_resolution_index(records)
+
+def load_ontologies(rdy2use_path, species, hpo_obo_file):
+    """
+    # Description
+    Returns the rdy2use ontologies of a species with their terms' first 2 characters as keys.
+
+    # Arguments
+    ``rdy2use_path`` (string): path of the rdy2use data. \n
+    ``species`` (string): the species of interest. \n
+    ``hpo_obo_file`` (string): path leading to the HPO .obo file, only loaded for human.
+
+    # Usage
+    >>> ontologies = load_ontologies("./data/rdy2use", "human", "./data/rdy2use/hp.obo")
+    """
+    ontologies = {
+        'GO': obo_parser.GODag("%s/%s_go-basic.obo" % (rdy2use_path, species)),
+        'R-': obo_parser.GODag("%s/%s_reactome.obo" % (rdy2use_path, species))}
+    if species == "human":
+        ontologies['HP'] = obo_parser.GODag(hpo_obo_file)
+    return ontologies
+
+def load_term_metadata(rdy2use_path, species, hpo_obo_file):
+    """
+    # Description
+    Returns the rdy2use terms metadata table of a species. \n
+    If the file is missing or older than the annotation file, the table is built again from the
+    ontologies and the annotations and saved.
+
+    # Arguments
+    ``rdy2use_path`` (string): path of the rdy2use data. \n
+    ``species`` (string): the species of interest. \n
+    ``hpo_obo_file`` (string): path leading to the HPO .obo file, only loaded for human.
+
+    # Usage
+    >>> metadata = load_term_metadata("./data/rdy2use", "human", "./data/rdy2use/hp.obo")
+    >>> pruned_terms = onto.get_pruned_ids(metadata, pruning_rules)
+    """
+    filename = "%s/%s_term_metadata.csv" % (rdy2use_path, species)
+    anno_path = "%s/%s_gene_annotation.json" % (rdy2use_path, species)
+    if not os.path.exists(filename) or os.path.getmtime(filename) < os.path.getmtime(anno_path):
+        metadata = onto.get_term_metadata(load_ontologies(rdy2use_path, species, hpo_obo_file), load_annotation(anno_path))
+        # the evidences of the annotations are only known during the preparation
+        metadata['weight'] = onto.get_term_weights(metadata)
+        onto.save_term_metadata(metadata, filename)
+        return metadata
+    metadata = onto.load_term_metadata(filename)
+    if 'weight' not in metadata.columns:
+        metadata['weight'] = onto.get_term_weights(metadata)
+    return metadata
+
+def load_term_store(rdy2use_path, species, hpo_obo_file):
+    """
+    # Description
+    Returns the rdy2use indexed store of the terms and annotations of a species. \n
+    If the file is missing, older than the annotation file or lacks terms fields, the store is built again and saved.
+
+    # Arguments
+    ``rdy2use_path`` (string): path of the rdy2use data. \n
+    ``species`` (string): the species of interest. \n
+    ``hpo_obo_file`` (string): path leading to the HPO .obo file, only loaded for human.
+
+    # Usage
+    >>> store = load_term_store("./data/rdy2use", "human", "./data/rdy2use/hp.obo")
+    >>> annotation = store.get_annotation(genes)
+    """
+    filename = "%s/%s_ontology.sqlite" % (rdy2use_path, species)
+    anno_path = "%s/%s_gene_annotation.json" % (rdy2use_path, species)
+    if os.path.exists(filename) and os.path.getmtime(filename) >= os.path.getmtime(anno_path):
+        store = termstore.TermStore(filename)
+        if store.columns == termstore.TERM_FIELDS:
+            return store
+        store.close()
+    termstore.build_term_store(filename, load_term_metadata(rdy2use_path, species, hpo_obo_file),
+        load_ontologies(rdy2use_path, species, hpo_obo_file), load_annotation(anno_path))
+    return termstore.TermStore(filename)
+
+def load_annotation(anno_path):
+    """
+    # Description
+    Returns the genes ids and their terms per ontology stored in the rdy2use annotation JSON file.
+
+    # Arguments
+    ``anno_path`` (string): path leading to the rdy2use gene annotation JSON file.
+
+    # Usage
+    >>> annotation = load_annotation("data/rdy2use/human_gene_annotation.json")
+    >>> print(annotation['P08069'].keys())
+    ... dict_keys(['GO', 'Reactome', 'HPO'])
+    """
+    with open(anno_path, 'rt') as jn:
+        return json.load(jn)
+
+def get_gene_transactions(genes, annotation, pruned_terms):
+    """
+    # Description
+    Returns a dict with the annotated genes of a list as keys and their transaction as values.
+    A gene transaction gathers the terms of all its ontologies, except the pruned ones.
+
+    # Arguments
+    ``genes`` (list of strings): the UniProtKB IDs of the genes. \n
+    ``annotation`` (dict): the genes ids and their terms per ontology. \n
+    ``pruned_terms`` (set): terms left out of the transactions.
+
+    # Usage
+    >>> pruned_terms = onto.get_pruned_ids(metadata, pruning_rules)
+    >>> gene_transactions = get_gene_transactions(["P08069", "P05019"], annotation, pruned_terms)
+    """
+    gene_transactions = {}
+    for gene_id in sorted(set(genes).intersection(annotation.keys())):
+        terms = [t_id for ids in annotation[gene_id].values() for t_id in ids]
+        gene_transactions[gene_id] = [t_id for t_id in terms if t_id not in pruned_terms]
+    return gene_transactions
+
+def mine_itemsets(transactions, min_support = 0.25, max_len = 2):
+    """
+    # Description
+    Returns the frequent itemsets of a list of transactions mined with mlxtend's fpgrowth.
+
+    # Arguments
+    ``transactions`` (list of sublists): the gene transactions. \n
+    ``min_support`` (float): the minimum support of the itemsets. 0 < min_support <= 1. \n
+    ``max_len`` (int): the maximum length of the itemsets.
+
+    # Usage
+    >>> itemsets = mine_itemsets(list(gene_transactions.values()), min_support = 0.25, max_len = 2)
+    """
+    te = TransactionEncoder()
+    trans_bool = te.fit(transactions).transform(transactions)
+    df = pd.DataFrame(trans_bool, columns=te.columns_)
+    return fpgrowth(df, min_support = min_support, max_len = max_len, use_colnames = True)
+
+def format_rules(rules):
+    """
+    # Description
+    Returns the rules with their antecedents and consequents written as sorted, comma separated terms.
+
+    # Arguments
+    ``rules`` (df): association rules from mlxtend.
+    """
+    rules = rules.copy()
+    rules["antecedents"] = rules["antecedents"].map(lambda x: ",".join(sorted(x)))
+    rules["consequents"] = rules["consequents"].map(lambda x: ",".join(sorted(x)))
+    return rules
+
+def join_columns(items):
+    """Returns the terms of each row of a 2D object array joined by commas, one column at a time."""
+    joined = items[:, 0]
+    for i in range(1, items.shape[1]):
+        joined = joined + "," + items[:, i]
+    return joined
+
+def get_rule_metrics(sAC, sA, sC):
+    """
+    # Description
+    Returns the metrics of rules computed from the supports of their itemsets, antecedents and consequents,
+    as the metric columns of mlxtend's association_rules.
+
+    # Arguments
+    ``sAC``, ``sA``, ``sC`` (arrays of floats): the supports of the itemsets, antecedents and consequents.
+    """
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        confidence = sAC / sA
+        leverage = sAC - sA * sC
+        zhang_denom = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+        return {
+            "antecedent support": sA,
+            "consequent support": sC,
+            "support": sAC,
+            "confidence": confidence,
+            "lift": confidence / sC,
+            "representativity": np.ones(len(sAC)),
+            "leverage": leverage,
+            "conviction": np.where(confidence < 1, (1 - sC) / (1 - confidence), np.inf),
+            "zhangs_metric": np.where(zhang_denom == 0, 0, leverage / zhang_denom),
+            "jaccard": sAC / (sA + sC - sAC),
+            "certainty": np.where(sC == 1, 0, (confidence - sC) / (1 - sC)),
+            "kulczynski": (sAC / sA + sAC / sC) / 2}
+
+def iter_rules(itemsets, metric = "confidence", min_threshold = 0.8, chunk_size = 100000):
+    """
+    # Description
+    Yields the association rules of frequent itemsets as tables, each holding the rules of at most ``chunk_size``
+    itemsets, with the columns of mlxtend's association_rules and the antecedents and consequents written as sorted,
+    comma separated terms. \n
+    The itemsets of each length are processed in chunks: the rules of a chunk are built column-wise for every
+    split of its itemsets, and the supports of their antecedents and consequents are looked up at once.
+
+    # Arguments
+    ``itemsets`` (df): frequent itemsets from mlxtend, with all the subsets of each itemset. If the table has a
+    ``frequent`` column, as returned by multisupport.mine_itemsets, only the rules of the frequent itemsets are
+    generated. \n
+    ``metric`` (string): the metric the rules are filtered with. \n
+    ``min_threshold`` (float): the minimum value of the metric. \n
+    ``chunk_size`` (int): the number of itemsets whose rules are computed together.
+
+    # Usage
+    >>> for rules in iter_rules(itemsets, metric = "confidence", min_threshold = 0.8):
+    >>>     print(rules.iloc[0][['antecedents', 'consequents', 'confidence']])
+    ... antecedents    GO:0002376
+        consequents    GO:0006955
+        confidence       0.923077
+    """
+    if metric not in RULE_COLUMNS[2:]:
+        raise ValueError("unknown metric %s" % metric)
+    terms = [sorted(iset) for iset in itemsets['itemsets']]
+    lengths = np.array([len(t) for t in terms])
+    if 'frequent' in itemsets.columns:
+        # the other itemsets only provide the supports of antecedents and consequents
+        lengths[~itemsets['frequent'].to_numpy(dtype = bool)] = 0
+    support = itemsets['support'].to_numpy(dtype = float)
+    keys = pd.Index([",".join(t) for t in terms])
+    for length in sorted(set(lengths[lengths > 1])):
+        rows = np.flatnonzero(lengths == length)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            items = np.empty((len(chunk), length), dtype = object)
+            items[:] = [terms[i] for i in chunk]
+            sAC = support[chunk]
+            for n_antecedents in range(length - 1, 0, -1):
+                for a_cols in combinations(range(length), n_antecedents):
+                    c_cols = [i for i in range(length) if i not in a_cols]
+                    antecedents = join_columns(items[:, list(a_cols)])
+                    consequents = join_columns(items[:, c_cols])
+                    a_pos, c_pos = keys.get_indexer(antecedents), keys.get_indexer(consequents)
+                    if (a_pos < 0).any() or (c_pos < 0).any():
+                        raise KeyError("the itemsets lack the subsets of some itemsets")
+                    metrics = get_rule_metrics(sAC, support[a_pos], support[c_pos])
+                    kept = metrics[metric] >= min_threshold
+                    if kept.any():
+                        rules = pd.DataFrame({'antecedents': antecedents[kept], 'consequents': consequents[kept]})
+                        for col in RULE_COLUMNS[2:]:
+                            rules[col] = metrics[col][kept]
+                        yield rules
+
+def save_rules(rules_chunks, filename):
+    """
+    # Description
+    Writes tables of formatted rules one after the other to a CSV or, if the file name ends with .parquet,
+    a Parquet file (which needs pyarrow), and returns the number of rules written. Only one table is held in
+    memory at a time.
+
+    # Arguments
+    ``rules_chunks`` (iterable of dfs): rules with their antecedents and consequents formatted as strings. \n
+    ``filename`` (string): the name of the file.
+
+    # Usage
+    >>> n_rules = save_rules(iter_rules(itemsets), "rules.parquet")
+    """
+    n_rules = 0
+    if filename.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for rules in rules_chunks:
+            table = pa.Table.from_pandas(rules, preserve_index = False)
+            if writer is None:
+                writer = pq.ParquetWriter(filename, table.schema)
+            writer.write_table(table)
+            n_rules += len(rules)
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns = RULE_COLUMNS), preserve_index = False), filename)
+        else:
+            writer.close()
+    else:
+        with open(filename, 'wt', newline = '') as rf:
+            for rules in rules_chunks:
+                rules.to_csv(rf, header = n_rules == 0, index = False)
+                n_rules += len(rules)
+            if n_rules == 0:
+                pd.DataFrame(columns = RULE_COLUMNS).to_csv(rf, index = False)
+    print("WROTE: %s" % filename)
+    return n_rules
+
+def init_worker(shared):
+    """Makes the data loaded once by the batch available to a worker process."""
+    _shared.update(shared)
+
+def mine_gene_list(args):
+    """
+    # Description
+    Mines the rules of a named gene list with the data shared by the batch, writes them to a CSV file
+    and returns a dict describing the list for the batch index.
+
+    # Arguments
+    ``args`` (tuple): the name of the gene list, the UniProtKB IDs of its genes and the name of its rules file.
+    """
+    name, genes, filename = args
+    shared = _shared
+    gene_transactions = get_gene_transactions(genes, shared['annotation'], shared['pruned_terms'])
+    itemsets = mine_itemsets(list(gene_transactions.values()), shared['min_support'], shared['max_len'])
+    if itemsets.empty:
+        # an empty rules file, with the columns of the rules
+        n_rules = save_rules([], "%s/%s" % (shared['out_path'], filename))
+    elif shared['background'] is not None:
+        # the q-values of the rules need all their p-values
+        rules = association_rules(itemsets, metric = shared['metric'], min_threshold = shared['min_threshold'])
+        rules = enrich.add_enrichment_pvalues(rules, shared['background'], len(gene_transactions))
+        n_rules = save_rules([format_rules(rules)], "%s/%s" % (shared['out_path'], filename))
+    else:
+        n_rules = save_rules(iter_rules(itemsets, metric = shared['metric'], min_threshold = shared['min_threshold']),
+            "%s/%s" % (shared['out_path'], filename))
+    return {
+        'name': name,
+        'genes': len(args[1]),
+        'annotated_genes': len(gene_transactions),
+        'itemsets': len(itemsets),
+        'rules': n_rules,
+        'file': filename}
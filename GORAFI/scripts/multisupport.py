@@ -0,0 +1,106 @@
+"""
+Frequent itemsets mining with multiple minimum supports, set per term from the terms metadata.
+
+MSApriori:
+Bing Liu, Wynne Hsu, Yiming Ma (1999).
+Mining association rules with multiple minimum supports.
+Proceedings of the fifth ACM SIGKDD international conference on Knowledge discovery and data mining.
+DOI:10.1145/312129.312274
+
+CFP-growth:
+Ya-Han Hu, Yen-Liang Chen (2006).
+Mining association rules with multiple minimum supports: a new mining algorithm and a support tuning mechanism.
+Decision Support Systems.
+DOI:10.1016/j.dss.2004.09.007
+
+An itemset is frequent when its support reaches the lowest minimum support of its terms, so that generic
+terms need a high support and specific ones a low support. The transactions are inserted in a CanTree ranking
+the terms by decreasing minimum support: the conditional pattern base of a term only holds terms with a higher
+minimum support, and is mined with the minimum support of that term. The terms less frequent than the lowest
+minimum support are left out of the tree, and a term less frequent than its own minimum support is never
+expanded. The supports of the subsets the rules need, which can be lower than their own minimum supports,
+are then counted on the tree.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import numpy as np
+import pandas as pd
+from itertools import combinations
+from collections import Counter
+import scripts.cantree as cantree
+
+def get_min_supports(metadata, rules, min_support = 0.25):
+    """
+    # Description
+    Returns the minimum support of each term of a metadata table, indexed by the terms ids. \n
+    A rule is a boolean expression over the columns of the metadata table with its minimum support: the first
+    rule selecting a term sets its minimum support, the terms selected by no rule keep ``min_support``.
+
+    # Arguments
+    ``metadata`` (df): the table returned by ontology.get_term_metadata. \n
+    ``rules`` (list of tuples): the (expression, minimum support) rules. \n
+    ``min_support`` (float): the minimum support of the other terms.
+
+    # Usage
+    >>> rules = [("ontology == 'GO' and depth <= 3", 0.5), ("ontology == 'Reactome' and level == 0", 0.1)]
+    >>> min_supports = get_min_supports(metadata, rules, min_support = 0.25)
+    >>> print(min_supports["GO:0002376"])
+    ... 0.5
+    """
+    values = np.full(len(metadata), min_support, dtype = float)
+    assigned = np.zeros(len(metadata), dtype = bool)
+    for expression, support in rules:
+        mask = metadata.eval(expression).to_numpy(dtype = bool) & ~assigned
+        values[mask] = support
+        assigned |= mask
+    return pd.Series(values, index = metadata['id'].to_numpy())
+
+def mine_itemsets(transactions, min_supports, min_support = 0.25, max_len = 2):
+    """
+    # Description
+    Returns the itemsets reaching the lowest minimum support of their terms, like mlxtend's fpgrowth with
+    ``use_colnames = True``, followed by the subsets of these itemsets which are not frequent themselves. \n
+    The ``frequent`` column tells them apart: the rules are only generated from the frequent itemsets, the
+    other ones only provide the supports of their antecedents and consequents.
+
+    # Arguments
+    ``transactions`` (list of lists): the terms of each gene. \n
+    ``min_supports`` (dict or Series): the terms and their minimum supports. \n
+    ``min_support`` (float): the minimum support of the terms missing from ``min_supports``. \n
+    ``max_len`` (int): the maximum length of the itemsets.
+
+    # Usage
+    >>> itemsets = mine_itemsets(transactions, get_min_supports(metadata, rules), max_len = 2)
+    >>> n_rules = mining.save_rules(mining.iter_rules(itemsets), "rules.csv")
+    """
+    n_trans = len(transactions)
+    counts = Counter(item for trans in transactions for item in set(trans))
+    if not counts:
+        return pd.DataFrame({'support': [], 'itemsets': [], 'frequent': []})
+    item_min_supports = dict((item, min_supports.get(item, min_support)) for item in counts.keys())
+    lowest = min(item_min_supports.values()) * n_trans
+    kept = set(item for item, count in counts.items() if count >= lowest)
+    order = dict((item, rank) for rank, item in enumerate(sorted(kept, key = lambda i: (-item_min_supports[i], i))))
+
+    tree = cantree.CanTree(order)
+    for tid, trans in enumerate(transactions):
+        tree.insert(tid, [item for item in trans if item in kept])
+    frequent = tree.mine(lowest, max_len,
+        min_counts = dict((item, item_min_supports[item] * n_trans) for item in kept))
+
+    subsets = {}
+    for itemset in frequent.keys():
+        for length in range(1, len(itemset)):
+            for subset in map(frozenset, combinations(itemset, length)):
+                if subset not in frequent and subset not in subsets:
+                    subsets[subset] = tree.get_count(subset)
+
+    itemsets = [(count, items, True) for items, count in frequent.items()]
+    itemsets.sort(key = lambda x: (len(x[1]), sorted(tree.get_rank(i) for i in x[1])))
+    itemsets.extend((count, items, False) for items, count in subsets.items())
+    return pd.DataFrame({
+        'support': [count / n_trans for count, _, _ in itemsets],
+        'itemsets': [items for _, items, _ in itemsets],
+        'frequent': [f for _, _, f in itemsets]})
@@ -5,57 +5,48 @@ Functions related to ontology managing.
 @ Asloudj Yanis
 """
 
+import numpy as np
+import pandas as pd
+from collections import Counter
 from goatools import obo_parser
 
-def save_as_obo(dictio, filename, header):
+# names of the ontologies, with their terms' first 2 characters as keys:
+ONTOLOGY_NAMES = {'GO': "GO", 'R-': "Reactome", 'HP': "HPO"}
+
+def save_as_obo(dictio, filename, header, keys = None, buffer_size = 1 << 20):
     """
     # Description
     Saves a dictionary of terms as a light v1.2 .obo file. \n 
     A term is a Python object with id, name, namespace, and _parents attributes. \n
-    A term can also have a relationship attribute (e.g. part_of).
+    A term can also have a relationship attribute (e.g. part_of). \n
+    The terms are written in a single buffered pass, in the order of the dictionary, without copying
+    or editing it: the terms left out are skipped, and the alternative ids of a term are written once.
 
     # Arguments
-    ``dictio`` (dict): GOTerms or REACTerms.
-    ``filename`` (string): the name of the .obo file.
-    ``header`` (string): header added to the .obo file.
+    ``dictio`` (dict): GOTerms or REACTerms. \n
+    ``filename`` (string): the name of the .obo file. \n
+    ``header`` (string): header added to the .obo file. \n
+    ``keys`` (set): the ids of the terms written to the file, all the terms if None. \n
+    ``buffer_size`` (int): the size of the write buffer, in bytes.
 
     # Usage
     >>> oboDag = goatools.obo_parser.GODag("go-basic.obo")
-    >>> oboDag.pop(x)
-    >>> save_as_obo(oboDag, "smaller_go-basic.obo")
-    """
-
-    # .obo file header:
-    dictio_obo_file = open(filename, 'wt')
-    dictio_obo_file.write("format-version: 1.2\n")
-    dictio_obo_file.write("%s\n\n" % header)
-
-    for k in dictio.keys():
-        term = dictio[k]
-
-        parents = set()
-        for par in term._parents:
-            parents.add("is_a: %s ! %s\n" % (par, dictio[par].name))
-
-        try:
-            relations = set()
-            for rel in term.relationship.keys():
-                # e.g. rel = 'part_of'
-                for cousin in term.relationship[rel]:
-                    relations.add("relationship: %s %s ! %s\n" % (rel, cousin.id, cousin.name))
-        except AttributeError:
-            relations = ""
-
-        # adds the .obo term:
-        entry = "".join(
-            ["[Term]\n",
-            "id: %s\n" % term.id,
-            "name: %s\n" % term.name,
-            "namespace: %s\n" % term.namespace,
-            "%s" % "".join(parents),
-            "%s\n" % "".join(relations)]
-        )
-        dictio_obo_file.write(entry)
+    >>> save_as_obo(oboDag, "smaller_go-basic.obo", "ontology: go", keys = filtered_go_onto_keys)
+    """
+    with open(filename, 'wt', buffering = buffer_size) as dictio_obo_file:
+        # .obo file header:
+        dictio_obo_file.write("format-version: 1.2\n%s\n\n" % header)
+        for k, term in dictio.items():
+            # alternative ids are keys of the same terms
+            if k != term.id or (keys is not None and k not in keys):
+                continue
+            entry = ["[Term]\nid: %s\nname: %s\nnamespace: %s\n" % (term.id, term.name, term.namespace)]
+            entry.extend("is_a: %s ! %s\n" % (par, dictio[par].name) for par in term._parents)
+            # e.g. rel = 'part_of'
+            for rel, cousins in getattr(term, "relationship", {}).items():
+                entry.extend(set("relationship: %s %s ! %s\n" % (rel, cousin.id, cousin.name) for cousin in cousins))
+            entry.append("\n")
+            dictio_obo_file.write("".join(entry))
     print("WROTE: %s" % filename)
 
 def get_ancestry_id(gene_id, annotation, ontology, relationship = False):
@@ -107,4 +98,130 @@ def get_term_ontology(term_id, ontologies):
     >>> print(len(get_term_ontology("GO:0005524", onto)))
     ... 47284
     """
-    return ontologies[term_id[:2]]
\ No newline at end of file
+    return ontologies[term_id[:2]]
+
+def get_term_metadata(ontologies, annotation, n_curated = None):
+    """
+    # Description
+    Returns a table of the ontologies terms with their ``ontology``, ``namespace``, ``depth``, ``level``,
+    number of annotated genes (``n_genes``) and information content (``ic``). \n
+    The information content of a term is -log(p) = log(1/p), p being the fraction of the genes annotated by its
+    ontology which are annotated by the term. It is missing for the terms annotating no gene.
+
+    # Arguments
+    ``ontologies`` (dict of GODag objects): ontologies as values and their terms' first 2 characters as keys. \n
+    ``annotation`` (dict): the genes ids and their terms per ontology, as in the rdy2use annotation file. \n
+    ``n_curated`` (dict): the terms and their number of genes annotated with a non electronic evidence, added
+    as a ``n_curated`` column.
+
+    # Usage
+    >>> metadata = get_term_metadata({'GO': go_onto, 'R-': react_onto, 'HP': hpo_onto}, rdy2use_data)
+    >>> print(metadata.iloc[0])
+    ... id           GO:0008150
+        ontology             GO
+        namespace    biological_process
+        depth                 0
+        level                 0
+        n_genes           17863
+        ic                  0.0
+    """
+    n_genes = Counter()
+    n_onto_genes = Counter()
+    for gene_anno in annotation.values():
+        for name, ids in gene_anno.items():
+            if ids:
+                n_onto_genes[name] += 1
+                n_genes.update(ids)
+    rows = []
+    for prefix, dag in ontologies.items():
+        for t_id, term in dag.items():
+            # alternative ids are keys of the same terms
+            if t_id == term.id:
+                rows.append((t_id, ONTOLOGY_NAMES[prefix], term.namespace, term.depth, term.level, n_genes[t_id]))
+    metadata = pd.DataFrame(rows, columns = ["id", "ontology", "namespace", "depth", "level", "n_genes"])
+    n_total = metadata['ontology'].map(n_onto_genes).to_numpy(dtype = float)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        metadata['ic'] = np.log(n_total / metadata['n_genes'].to_numpy())
+    metadata.loc[metadata['n_genes'] == 0, 'ic'] = np.nan
+    if n_curated is not None:
+        metadata['n_curated'] = metadata['id'].map(n_curated).fillna(0).astype(int)
+    return metadata
+
+def get_term_weights(metadata, factors = ("ic", "evidence")):
+    """
+    # Description
+    Returns the weights of the terms of a metadata table, between 0 and 1, as the product of factors:
+    ``ic``, the information content of the term divided by the highest one of its ontology; ``depth``, the
+    depth of the term plus 1 divided by the highest one of its ontology plus 1; ``evidence``, the fraction of
+    the genes annotated by the term with a non electronic evidence (1 when the table has no ``n_curated``).
+
+    # Arguments
+    ``metadata`` (df): the table returned by get_term_metadata. \n
+    ``factors`` (iterable of strings): the factors of the weights.
+
+    # Usage
+    >>> metadata['weight'] = get_term_weights(metadata, ["ic", "evidence"])
+    >>> print(metadata.set_index('id').loc["GO:0006955", 'weight'])
+    ... 0.4137
+    """
+    weights = np.ones(len(metadata))
+    ontology = metadata.groupby('ontology')
+    for factor in factors:
+        if factor == "ic":
+            ic = metadata['ic'] / ontology['ic'].transform('max')
+            weights *= ic.fillna(0).to_numpy()
+        elif factor == "depth":
+            weights *= ((metadata['depth'] + 1) / (ontology['depth'].transform('max') + 1)).to_numpy()
+        elif factor == "evidence":
+            if 'n_curated' in metadata.columns:
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    curated = metadata['n_curated'].to_numpy(dtype = float) / metadata['n_genes'].to_numpy()
+                weights *= np.nan_to_num(curated)
+        else:
+            raise ValueError("unknown weight factor %s" % factor)
+    return weights
+
+def save_term_metadata(metadata, filename):
+    """
+    # Description
+    Saves a table of terms metadata as a CSV file.
+
+    # Arguments
+    ``metadata`` (df): the table returned by get_term_metadata. \n
+    ``filename`` (string): the name of the CSV file.
+    """
+    metadata.to_csv(filename, index = False)
+    print("WROTE: %s" % filename)
+
+def load_term_metadata(filename):
+    """
+    # Description
+    Returns a table of terms metadata saved as a CSV file.
+
+    # Arguments
+    ``filename`` (string): the name of the CSV file.
+
+    # Usage
+    >>> metadata = load_term_metadata("data/rdy2use/human_term_metadata.csv")
+    """
+    return pd.read_csv(filename, dtype = {'id': str, 'ontology': str, 'namespace': str})
+
+def get_pruned_ids(metadata, rules):
+    """
+    # Description
+    Returns the ids of the terms selected by any of the pruning rules. \n
+    A rule is a boolean expression over the columns of the metadata table, evaluated on all the terms at once.
+
+    # Arguments
+    ``metadata`` (df): the table returned by get_term_metadata. \n
+    ``rules`` (list of strings): the pruning rules.
+
+    # Usage
+    >>> rules = ["ontology != 'Reactome' and depth == 0", "ontology == 'Reactome' and depth * level <= level + depth"]
+    >>> print(len(get_pruned_ids(metadata, rules)))
+    ... 31
+    """
+    mask = np.zeros(len(metadata), dtype = bool)
+    for rule in rules:
+        mask |= metadata.eval(rule).to_numpy(dtype = bool)
+    return set(metadata['id'].to_numpy()[mask])
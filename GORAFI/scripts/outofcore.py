@@ -0,0 +1,184 @@
+"""
+Out-of-core frequent itemset mining of whole-species gene annotations.
+
+The annotation JSON file is streamed twice. The first pass counts the terms. The second pass
+writes, for each frequent term of each gene, the projected transaction (the more frequent terms
+of the gene) to a partition file on disk. Each partition is then loaded by groups of terms fitting
+a memory budget and their conditional pattern bases are mined one after the other.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import os
+import csv
+import scripts.common as cmn
+import scripts.cantree as cantree
+from collections import Counter
+
+# estimated ratio between the memory taken by a loaded projected transaction and its size on disk:
+MEMORY_FACTOR = 8
+
+def iter_gene_transactions(anno_path, pruned_terms = set()):
+    """
+    # Description
+    Iterate over the genes of an annotation JSON file and their terms of all ontologies.
+
+    # Arguments
+    ``anno_path`` (string): path leading to the rdy2use gene annotation JSON file. \n
+    ``pruned_terms`` (set): terms left out of the transactions.
+
+    # Usage
+    >>> for gene_id, terms in iter_gene_transactions("data/rdy2use/human_gene_annotation.json"):
+        print(gene_id, len(terms))
+    ... P08069 341
+    """
+    with open(anno_path, 'rt') as jn:
+        for gene_id, gene_anno in cmn.iter_json_items(jn):
+            terms = set(t_id for ids in gene_anno.values() for t_id in ids)
+            yield gene_id, terms.difference(pruned_terms)
+
+def count_terms(anno_path, pruned_terms = set()):
+    """
+    # Description
+    Returns the number of genes of an annotation JSON file and a Counter of their terms, in one streaming pass.
+
+    # Arguments
+    ``anno_path`` (string): path leading to the rdy2use gene annotation JSON file. \n
+    ``pruned_terms`` (set): terms left out of the transactions.
+
+    # Usage
+    >>> n_genes, term_count = count_terms("data/rdy2use/human_gene_annotation.json")
+    """
+    n_genes = 0
+    term_count = Counter()
+    for _, terms in iter_gene_transactions(anno_path, pruned_terms):
+        n_genes += 1
+        term_count.update(terms)
+    return n_genes, term_count
+
+def write_projections(anno_path, rank, tmp_path, n_partitions, pruned_terms = set()):
+    """
+    # Description
+    Writes the projected transactions of each frequent term to partition files and returns the
+    partition files paths and the number of bytes written for each term. \n
+    A line of a partition file holds the rank of a term, a tab, and the comma separated ranks of
+    the more frequent terms of a gene.
+
+    # Arguments
+    ``anno_path`` (string): path leading to the rdy2use gene annotation JSON file. \n
+    ``rank`` (dict): the frequent terms and their rank by descending frequency. \n
+    ``tmp_path`` (string): directory where the partition files are written. \n
+    ``n_partitions`` (int): the number of partition files. \n
+    ``pruned_terms`` (set): terms left out of the transactions.
+    """
+    os.makedirs(tmp_path, exist_ok = True)
+    paths = ["%s/partition_%s.txt" % (tmp_path, p) for p in range(n_partitions)]
+    handles = [open(path, 'wt', buffering = 1 << 20) for path in paths]
+    rank_bytes = Counter()
+    try:
+        for _, terms in iter_gene_transactions(anno_path, pruned_terms):
+            ordered = sorted(rank[t_id] for t_id in terms if t_id in rank)
+            for j in range(1, len(ordered)):
+                line = "%s\t%s\n" % (ordered[j], ",".join(map(str, ordered[:j])))
+                handles[ordered[j] % n_partitions].write(line)
+                rank_bytes[ordered[j]] += len(line)
+    finally:
+        for handle in handles:
+            handle.close()
+    return paths, rank_bytes
+
+def get_load_groups(ranks, rank_bytes, memory_budget):
+    """
+    # Description
+    Returns groups of term ranks whose projected transactions fit together in a memory budget.
+    A term whose projected transactions alone exceed the budget gets a group of its own.
+
+    # Arguments
+    ``ranks`` (list): the ranks of the terms of a partition. \n
+    ``rank_bytes`` (dict): the ranks and the size of their projected transactions on disk. \n
+    ``memory_budget`` (int): the memory available to load projected transactions, in bytes.
+    """
+    groups = []
+    group, group_size = set(), 0
+    for r in sorted(ranks):
+        size = rank_bytes[r] * MEMORY_FACTOR
+        if group and group_size + size > memory_budget:
+            groups.append(group)
+            group, group_size = set(), 0
+        group.add(r)
+        group_size += size
+    if group:
+        groups.append(group)
+    return groups
+
+def mine_partition(path, group, min_count, max_len):
+    """
+    # Description
+    Returns the frequent itemsets (as rank tuples) and their counts, for the terms of a group
+    whose projected transactions are stored in a partition file.
+
+    # Arguments
+    ``path`` (string): path of the partition file. \n
+    ``group`` (set): the ranks of the terms mined. \n
+    ``min_count`` (float): the minimum number of genes annotated by an itemset. \n
+    ``max_len`` (int): the maximum length of the itemsets.
+    """
+    bases = dict((r, Counter()) for r in group)
+    with open(path, 'rt') as pt:
+        for line in pt:
+            r, prefix = line.rstrip("\n").split("\t")
+            r = int(r)
+            if r in bases:
+                bases[r][tuple(map(int, prefix.split(",")))] += 1
+    itemsets = {}
+    for r in sorted(bases.keys()):
+        cantree.mine_pattern_base(list(bases[r].items()), (r,), min_count, max_len, itemsets)
+    return itemsets
+
+def mine_out_of_core(anno_path, out_path, min_support = 0.25, max_len = None, memory_budget = 2048,
+                     tmp_path = "./data/tmp", n_partitions = 64, pruned_terms = set()):
+    """
+    # Description
+    Mines the frequent itemsets of every gene of an annotation JSON file within a memory budget,
+    writes them to a CSV file with ``support`` and ``itemsets`` columns and returns their number.
+
+    # Arguments
+    ``anno_path`` (string): path leading to the rdy2use gene annotation JSON file. \n
+    ``out_path`` (string): path of the CSV file of the frequent itemsets. \n
+    ``min_support`` (float): the minimum support of the itemsets. 0 < min_support <= 1. \n
+    ``max_len`` (int): the maximum length of the itemsets. \n
+    ``memory_budget`` (int): the memory available to load projected transactions, in megabytes. \n
+    ``tmp_path`` (string): directory where the partition files are written and removed. \n
+    ``n_partitions`` (int): the number of partition files. \n
+    ``pruned_terms`` (set): terms left out of the transactions.
+
+    # Usage
+    >>> n = mine_out_of_core("data/rdy2use/human_gene_annotation.json", "itemsets.csv", min_support = 0.01, max_len = 2)
+    """
+    n_genes, term_count = count_terms(anno_path, pruned_terms)
+    min_count = min_support * n_genes
+    freq_terms = [t_id for t_id in term_count.keys() if term_count[t_id] >= min_count]
+    freq_terms.sort(key = lambda t_id: (-term_count[t_id], t_id))
+    rank = dict((t_id, r) for r, t_id in enumerate(freq_terms))
+
+    n_itemsets = 0
+    with open(out_path, 'wt', newline = '') as out:
+        writer = csv.writer(out)
+        writer.writerow(["support", "itemsets"])
+        for t_id in freq_terms:
+            writer.writerow([term_count[t_id] / n_genes, t_id])
+            n_itemsets += 1
+        if max_len is None or max_len > 1:
+            paths, rank_bytes = write_projections(anno_path, rank, tmp_path, n_partitions, pruned_terms)
+            for p, path in enumerate(paths):
+                ranks = [r for r in rank_bytes.keys() if r % n_partitions == p]
+                for group in get_load_groups(ranks, rank_bytes, memory_budget * 1024 ** 2):
+                    itemsets = mine_partition(path, group, min_count, max_len)
+                    for items in sorted(itemsets.keys(), key = sorted):
+                        terms = [freq_terms[r] for r in sorted(items)]
+                        writer.writerow([itemsets[items] / n_genes, ",".join(terms)])
+                        n_itemsets += 1
+                os.remove(path)
+    print("WROTE: %s" % out_path)
+    return n_itemsets
@@ -0,0 +1,155 @@
+"""
+Permutation null model for the significance of association rules.
+
+Random gene sets of the same size as the gene list are drawn from the annotated background.
+The itemsets of the observed rules are encoded once as a boolean genes x itemsets matrix, shared
+by the worker processes, so a random gene set is evaluated by summing a few rows of the matrix.
+A rule is found in a random gene set when it passes the same support and metric thresholds as the
+mined rules, and its empirical p-value is the frequency of random gene sets where it is found with
+a metric value at least as high as the observed one.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import multiprocessing as mp
+import numpy as np
+import scripts.stats as st
+
+# read-only null model data inherited by the worker processes:
+_null_model = {}
+
+def get_itemset_matrix(annotation, itemsets):
+    """
+    # Description
+    Returns a boolean matrix with the background genes as rows and the itemsets as columns,
+    True when a gene is annotated by every term of an itemset.
+
+    # Arguments
+    ``annotation`` (dict): the genes ids and their terms per ontology, as in the rdy2use annotation file. \n
+    ``itemsets`` (list of frozensets): the itemsets.
+
+    # Usage
+    >>> matrix = get_itemset_matrix(annotation, [frozenset(["GO:0006955"]), frozenset(["GO:0006955", "R-HSA-168256"])])
+    >>> print(matrix.shape)
+    ... (18424, 2)
+    """
+    needed = set(t_id for itemset in itemsets for t_id in itemset)
+    term_genes = dict((t_id, np.zeros(len(annotation), dtype = bool)) for t_id in needed)
+    for g, gene_id in enumerate(annotation.keys()):
+        for terms in annotation[gene_id].values():
+            for t_id in terms:
+                if t_id in term_genes:
+                    term_genes[t_id][g] = True
+    matrix = np.ones((len(annotation), len(itemsets)), dtype = bool)
+    for i, itemset in enumerate(itemsets):
+        for t_id in itemset:
+            matrix[:, i] &= term_genes[t_id]
+    return matrix
+
+def get_rule_metric(support, antecedent_support, consequent_support, metric):
+    """
+    # Description
+    Returns the values of an mlxtend association rules metric from the supports of the rules.
+
+    # Arguments
+    ``support`` (array): the supports of the rules. \n
+    ``antecedent_support`` (array): the supports of the antecedents. \n
+    ``consequent_support`` (array): the supports of the consequents. \n
+    ``metric`` (string): 'support', 'confidence', 'lift' or 'leverage'.
+    """
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        if metric == "support":
+            return support
+        if metric == "confidence":
+            return support / antecedent_support
+        if metric == "lift":
+            return support / (antecedent_support * consequent_support)
+        if metric == "leverage":
+            return support - antecedent_support * consequent_support
+    raise ValueError("unsupported metric: %s" % metric)
+
+def init_worker(model):
+    """Makes the null model data available to a worker process."""
+    _null_model.update(model)
+
+def count_exceedances(args):
+    """
+    # Description
+    Returns, for each rule, the number of random gene sets where the rule passes the thresholds with a
+    metric value at least as high as the observed one.
+
+    # Arguments
+    ``args`` (tuple): the seed of the random generator and the number of random gene sets.
+    """
+    seed, n_permutations = args
+    model = _null_model
+    rng = np.random.default_rng(seed)
+    matrix = model['matrix']
+    exceed = np.zeros(len(model['observed']), dtype = int)
+    for _ in range(n_permutations):
+        rows = rng.choice(matrix.shape[0], model['n_genes'], replace = False)
+        supports = matrix[rows].sum(axis = 0) / model['n_genes']
+        support = supports[model['union']]
+        value = get_rule_metric(support, supports[model['antecedent']], supports[model['consequent']], model['metric'])
+        found = (support >= model['min_support']) & (value >= model['min_threshold'])
+        exceed += found & (value >= model['observed'])
+    return exceed
+
+def add_permutation_pvalues(rules, annotation, n_genes, n_permutations = 1000, min_support = 0.25,
+                            metric = "confidence", min_threshold = 0.8, n_jobs = None, seed = None):
+    """
+    # Description
+    Returns the rules with the empirical ``p_value`` and the Benjamini-Hochberg ``q_value`` of their
+    metric under random gene sets of the same size drawn from the annotated background.
+
+    # Arguments
+    ``rules`` (df): association rules from mlxtend, with frozensets of terms as antecedents and consequents. \n
+    ``annotation`` (dict): the background genes ids and their terms per ontology. \n
+    ``n_genes`` (int): the number of genes the rules were mined from. \n
+    ``n_permutations`` (int): the number of random gene sets. \n
+    ``min_support`` (float): the minimum support the rules were mined with. \n
+    ``metric`` (string): the metric the rules were filtered with, also used as the test statistic. \n
+    ``min_threshold`` (float): the minimum value of the metric the rules were filtered with. \n
+    ``n_jobs`` (int): the number of worker processes. Defaults to the number of CPUs. \n
+    ``seed``: the seed of the random generator.
+
+    # Usage
+    >>> rules = association_rules(itemsets)
+    >>> rules = add_permutation_pvalues(rules, annotation, len(gene_transactions), n_permutations = 5000)
+    >>> print(rules[['antecedents', 'consequents', 'p_value', 'q_value']])
+    """
+    rules = rules.copy()
+    if rules.empty:
+        rules['p_value'] = []
+        rules['q_value'] = []
+        return rules
+    n_jobs = n_jobs or mp.cpu_count()
+    unions = [a | c for a, c in zip(rules['antecedents'], rules['consequents'])]
+    itemsets = sorted(set(rules['antecedents']) | set(rules['consequents']) | set(unions), key = sorted)
+    index = dict((itemset, i) for i, itemset in enumerate(itemsets))
+
+    observed = get_rule_metric(rules['support'].values, rules['antecedent support'].values,
+        rules['consequent support'].values, metric)
+    model = {
+        'matrix': get_itemset_matrix(annotation, itemsets),
+        'n_genes': n_genes,
+        'antecedent': np.array([index[a] for a in rules['antecedents']]),
+        'consequent': np.array([index[c] for c in rules['consequents']]),
+        'union': np.array([index[u] for u in unions]),
+        # tolerate rounding errors between mlxtend and the null model
+        'observed': observed - 1e-12,
+        'metric': metric,
+        'min_support': min_support,
+        'min_threshold': min_threshold}
+
+    # the random gene sets are split in one chunk per worker with independent seeds
+    chunks = [n_permutations // n_jobs + (1 if k < n_permutations % n_jobs else 0) for k in range(n_jobs)]
+    seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+    tasks = [(s, n) for s, n in zip(seeds, chunks) if n > 0]
+    with mp.Pool(len(tasks), initializer = init_worker, initargs = (model,)) as pool:
+        exceed = sum(pool.map(count_exceedances, tasks))
+
+    rules['p_value'] = (1 + exceed) / (1 + n_permutations)
+    rules['q_value'] = st.get_bh_qvalues(rules['p_value'].values)
+    return rules
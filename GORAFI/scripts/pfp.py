@@ -0,0 +1,231 @@
+"""
+Parallel FP-growth mining partitioned by header-table item groups.
+
+PFP:
+Haoyuan Li, Yi Wang, Dong Zhang, Ming Zhang, Edward Y. Chang (2008).
+PFP: Parallel FP-Growth for Query Recommendation.
+Proceedings of the 2008 ACM Conference on Recommender Systems.
+DOI:10.1145/1454008.1454027
+
+The items of the global frequency list are split into groups. Each transaction is then sent once
+to each group it involves, truncated after its last item of the group (group-dependent shards).
+An itemset is mined in the shard of the group of its least frequent item only, so the workers
+never need to communicate and their results are merged without duplicates.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import multiprocessing as mp
+import pandas as pd
+import scripts.wofptree as wofp
+from mlxtend.frequent_patterns import fpgrowth
+from mlxtend.preprocessing.transactionencoder import TransactionEncoder
+
+def get_item_groups(freq_items, n_groups):
+    """
+    # Description
+    Returns a dict with the frequent items as keys and their group number as values. \n
+    Items are dealt out in a round-robin fashion along the frequency list, so that the heavy
+    conditional trees of the least frequent items are spread evenly over the groups.
+
+    # Arguments
+    ``freq_items`` (df): the items names and their frequencies, ordered by descending frequency and ascending name. \n
+    ``n_groups`` (int): the number of groups.
+
+    # Usage
+    >>> freq_items, trans_weights = get_frequency_and_weight(trans_db = trans, weight_items = w_items, min_sup = 0.25)
+    >>> print(get_item_groups(freq_items, 2))
+    ... {'D': 0, 'A': 1, 'B': 0, 'C': 1, 'E': 0}
+    """
+    return dict((item, i % n_groups) for i, item in enumerate(freq_items['item']))
+
+def get_group_shards(trans_db, freq_items, item_group):
+    """
+    # Description
+    Returns the group-dependent shards of a transaction database. \n
+    A shard is a dict with the ordered truncated transactions (``trans``) and the index of the
+    original transaction they come from (``index``).
+
+    # Arguments
+    ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
+    ``freq_items`` (df): the items names and their frequencies, ordered by descending frequency and ascending name. \n
+    ``item_group`` (dict): the frequent items and their group number.
+
+    # Usage
+    >>> item_group = get_item_groups(freq_items, 2)
+    >>> shards = get_group_shards(trans, freq_items, item_group)
+    >>> print(shards[1]['trans'])
+    ... [['D', 'A', 'B', 'C'], ['D', 'C'], ['D', 'A']]
+    """
+    rank = dict((item, i) for i, item in enumerate(freq_items['item']))
+    shards = dict((g, {'trans': [], 'index': []}) for g in sorted(set(item_group.values())))
+    for k, t in enumerate(trans_db):
+        ordered = sorted(set(x for x in t if x in rank), key = rank.get)
+        sent = set()
+        # walk the transaction backward so that each group gets its longest prefix only
+        for j in range(len(ordered) - 1, -1, -1):
+            g = item_group[ordered[j]]
+            if g not in sent:
+                shards[g]['trans'].append(ordered[:j + 1])
+                shards[g]['index'].append(k)
+                sent.add(g)
+    return shards
+
+def mine_fpgrowth_shard(args):
+    """
+    # Description
+    Returns the frequent itemsets of a shard whose least frequent item belongs to the shard group,
+    as a list of (support, items) tuples with supports relative to the whole database.
+
+    # Arguments
+    ``args`` (tuple): the shard transactions, the group items, the items ranks in the frequency list,
+    the number of transactions of the whole database, the minimum support and the maximum length.
+    """
+    shard_trans, group, rank, n_trans, min_support, max_len = args
+    if not shard_trans:
+        return []
+    # the minimum support is given for the whole database, not for the shard
+    shard_support = min_support * n_trans / len(shard_trans)
+    if shard_support > 1:
+        return []
+    te = TransactionEncoder()
+    trans_bool = te.fit(shard_trans).transform(shard_trans)
+    df = pd.DataFrame(trans_bool, columns=te.columns_)
+    itemsets = fpgrowth(df, min_support = shard_support, max_len = max_len, use_colnames = True)
+    mined = []
+    for support, items in zip(itemsets['support'], itemsets['itemsets']):
+        if max(items, key = rank.get) in group:
+            mined.append((support * len(shard_trans) / n_trans, tuple(sorted(items, key = rank.get))))
+    return mined
+
+def mine_wofp_shard(args):
+    """
+    # Description
+    Returns the weighted frequent patterns of a shard whose least frequent item belongs to the shard group,
+    as a list of (item, parent item, weight) tuples.
+
+    # Arguments
+    ``args`` (tuple): the shard transactions, their weights, the total weight of the whole database,
+    the group items, the frequent items and the minimum weight.
+    """
+    shard_trans, shard_weights, total_weight, group, freq_items, min_weight = args
+    mined = []
+    if not shard_trans:
+        return mined
+    fptree, item_nodes = wofp.construct_fptree(shard_trans, freq_items, shard_weights, total_weight)
+    for item in item_nodes.keys():
+        if item not in group:
+            continue
+        cond_tree = wofp.get_condition_tree(item, fptree, item_nodes)
+        for parent_item in cond_tree.keys():
+            if cond_tree[parent_item] > min_weight:
+                mined.append((item, parent_item, round(cond_tree[parent_item], 2)))
+    return mined
+
+def parallel_fpgrowth(df, min_support = 0.5, max_len = None, n_jobs = None):
+    """
+    # Description
+    Returns the frequent itemsets of a one-hot encoded data frame, mined in parallel. \n
+    The output is the same as mlxtend's fpgrowth with ``use_colnames = True``, ordered by itemset
+    length then by the frequency rank of the items.
+
+    # Arguments
+    ``df`` (df): one-hot encoded transactions, with items as columns. \n
+    ``min_support`` (float): the minimum support of the itemsets. 0 < min_support <= 1. \n
+    ``max_len`` (int): the maximum length of the itemsets. \n
+    ``n_jobs`` (int): the number of worker processes. Defaults to the number of CPUs.
+
+    # Usage
+    >>> te = TransactionEncoder()
+    >>> df = pd.DataFrame(te.fit(trans).transform(trans), columns=te.columns_)
+    >>> itemsets = parallel_fpgrowth(df, min_support = 0.25, max_len = 2, n_jobs = 4)
+    >>> rules = association_rules(itemsets)
+    """
+    n_jobs = n_jobs or mp.cpu_count()
+    columns = df.columns.values
+    trans_db = [list(columns[row]) for row in df.values]
+    n_trans = len(trans_db)
+
+    # global frequency pass, every transaction weighs the same:
+    weight_items = dict.fromkeys(columns, 1)
+    freq_items, _ = wofp.get_frequency_and_weight(trans_db, weight_items, min_sup = 0)
+    # get_frequency_and_weight sums float frequencies: keep borderline items, the shards filter them exactly
+    freq_items = freq_items[freq_items['freq'] >= min_support - 0.5 / n_trans]
+
+    rank = dict((item, i) for i, item in enumerate(freq_items['item']))
+    item_group = get_item_groups(freq_items, n_jobs)
+    shards = get_group_shards(trans_db, freq_items, item_group)
+    tasks = []
+    for g in shards.keys():
+        group = set(item for item in item_group.keys() if item_group[item] == g)
+        tasks.append((shards[g]['trans'], group, rank, n_trans, min_support, max_len))
+
+    with mp.Pool(n_jobs) as pool:
+        results = pool.map(mine_fpgrowth_shard, tasks)
+
+    mined = [x for res in results for x in res]
+    mined.sort(key = lambda x: (len(x[1]), [rank[i] for i in x[1]]))
+    return pd.DataFrame({
+        'support': [x[0] for x in mined],
+        'itemsets': [frozenset(x[1]) for x in mined]})
+
+def parallel_wofp(trans_db, weight_items, min_sup = 0.1, min_weight = 0.20, n_jobs = None):
+    """
+    # Description
+    Returns the weighted frequent patterns of a transaction database, mined in parallel with WOFP trees. \n
+    Patterns are ordered by the frequency rank of their items.
+
+    # Arguments
+    ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
+    ``weight_items`` (dict): the items names as keys and their weights as values. \n
+    ``min_sup`` (float): the minimum support necessary to keep an item. 0 < min_sup <= 1. \n
+    ``min_weight`` (float): itemsets with a weight equal or higher to this value (0<v<1) are considered patterns. \n
+    ``n_jobs`` (int): the number of worker processes. Defaults to the number of CPUs.
+
+    # Usage
+    >>> w_items = {'GO1': 1, 'GO2': 1, 'R-1': 1, 'GO3': 1, 'R-2': 1, 'HP1': 1}
+    >>> print(parallel_wofp(trans, w_items, min_sup = 0.25, n_jobs = 2))
+    ... {('GO1', 'R-1'): 0.4, ('GO2', 'R-1'): 0.4, ('GO2', 'GO1'): 0.4, ('GO3', 'R-1'): 0.4, ('HP1', 'GO2'): 0.4}
+    """
+    n_jobs = n_jobs or mp.cpu_count()
+    freq_items, weight_trans = wofp.get_frequency_and_weight(trans_db, weight_items, min_sup)
+    total_weight = sum(weight_trans)
+
+    rank = dict((item, i) for i, item in enumerate(freq_items['item']))
+    item_group = get_item_groups(freq_items, n_jobs)
+    shards = get_group_shards(trans_db, freq_items, item_group)
+    tasks = []
+    for g in shards.keys():
+        group = set(item for item in item_group.keys() if item_group[item] == g)
+        shard_weights = [weight_trans[k] for k in shards[g]['index']]
+        tasks.append((shards[g]['trans'], shard_weights, total_weight, group, freq_items, min_weight))
+
+    with mp.Pool(n_jobs) as pool:
+        results = pool.map(mine_wofp_shard, tasks)
+
+    mined = [x for res in results for x in res]
+    mined.sort(key = lambda x: (rank[x[0]], rank[x[1]]))
+    return dict(((item, parent_item), weight) for item, parent_item, weight in mined)
+
+if __name__ == "__main__":
+    import random
+
+    # the parallel miners must find the same patterns as the serial ones, whatever the number of workers
+    rng = random.Random(0)
+    items = ["GO:%07d" % i for i in range(25)] + ["R-HSA-%d" % i for i in range(15)]
+    trans = [rng.sample(items, rng.randint(1, 10)) for _ in range(300)]
+    w_items = dict((item, rng.random()) for item in items)
+
+    te = TransactionEncoder()
+    df = pd.DataFrame(te.fit(trans).transform(trans), columns=te.columns_)
+    serial = fpgrowth(df, min_support = 0.02, max_len = 3, use_colnames = True)
+    freq_items, weight_trans = wofp.get_frequency_and_weight(trans, w_items, min_sup = 0.1)
+    tree, item_nodes = wofp.construct_fptree(trans, freq_items, weight_trans)
+    serial_wofp = wofp.get_association_rules(tree, item_nodes, min_weight = 0.02)
+    for n_jobs in [2, 3]:
+        itemsets = parallel_fpgrowth(df, min_support = 0.02, max_len = 3, n_jobs = n_jobs)
+        assert dict(zip(itemsets['itemsets'], itemsets['support'].round(9))) == \
+            dict(zip(serial['itemsets'], serial['support'].round(9)))
+        assert parallel_wofp(trans, w_items, min_sup = 0.1, min_weight = 0.02, n_jobs = n_jobs) == serial_wofp
+    print("parallel_fpgrowth: %s itemsets, parallel_wofp: %s patterns" % (len(serial), len(serial_wofp)))
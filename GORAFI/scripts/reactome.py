@@ -31,8 +31,11 @@ REAC_HIER_FIELDS = [
 class REACTerm:
     """
     Reactome term created in order to write the .obo file.
+    A term is created for every pathway of every species, so its attributes are slotted instead of kept in a dict.
     """
 
+    __slots__ = ("id", "name", "namespace", "_parents")
+
     def __init__(self, id, name, namespace, _parents):
         """
         ``id``: unique and stable identifier of the Reactome pathway. \n
@@ -57,13 +60,15 @@ class REACTerm:
             "_parents:\t{%s items}\t%s" % (len(self._parents), self._parents)]
         return "".join(ret)
 
-def load_reactome_annotation(anno_path):
+def load_reactome_annotation(anno_path, curated = None):
     """
     # Description
     Returns a dictionary with genes ids as keys and their respective leaf Reactome nodes as a set of values.
 
     # Arguments
-    ``anno_path`` (string): path leading to the Reactome annotation file.
+    ``anno_path`` (string): path leading to the Reactome annotation file. \n
+    ``curated`` (dict): if given, filled with the genes ids and their leaf nodes annotated with a non
+    electronic evidence (not IEA).
 
     # Usage
     >>> anno = load_reactome_annotation("data/raw/reactome_annotation.txt")
@@ -77,6 +82,8 @@ def load_reactome_annotation(anno_path):
                 reactome_anno[rec['DB_Object_ID']].add(rec['Path_ID'])
             except KeyError:
                 reactome_anno[rec['DB_Object_ID']] = set([rec['Path_ID']])
+            if curated is not None and rec['Evidence'] != "IEA":
+                curated.setdefault(rec['DB_Object_ID'], set()).add(rec['Path_ID'])
     return reactome_anno
 
 def load_reactome_hierarchy(hier_path):
@@ -0,0 +1,128 @@
+"""
+Resolution of gene identifiers (symbols, synonyms and UniProtKB accessions) to UniProtKB IDs.
+
+The resolution index maps each upper case identifier to a single UniProtKB ID. An identifier known
+under several kinds is resolved with the most reliable one (accession, then symbol, then synonym).
+An identifier left with several candidate IDs is ambiguous: it is resolved to the candidate with the
+most annotations, and its candidates are recorded. Lists of identifiers are resolved with one
+vectorized lookup, and the unresolved and ambiguous identifiers are reported.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import numpy as np
+import pandas as pd
+
+# identifiers kinds, from the most to the least reliable:
+KIND_RANKS = {'accession': 0, 'symbol': 1, 'synonym': 2}
+
+def get_resolution_index(records, weights = None):
+    """
+    # Description
+    Returns the resolution index of a species: a table indexed by the upper case identifiers (``key``),
+    with their UniProtKB ``id``, the ``kind`` they were resolved with, and the comma separated
+    ``candidates`` of the ambiguous identifiers (empty otherwise).
+
+    # Arguments
+    ``records`` (iterable of tuples): (identifier, kind, UniProtKB ID) records, the kind being one of
+    "accession", "symbol" or "synonym". \n
+    ``weights`` (dict): UniProtKB IDs and their number of annotations, used to resolve the ambiguous identifiers.
+
+    # Usage
+    >>> records = [("P08069", "accession", "P08069"), ("IGF1R", "symbol", "P08069"), ("JTK13", "synonym", "P08069")]
+    >>> index = get_resolution_index(records)
+    >>> print(index.loc["JTK13"])
+    ... id             P08069
+        kind          synonym
+        candidates
+    """
+    df = pd.DataFrame(records, columns = ["identifier", "kind", "id"])
+    df['key'] = df['identifier'].str.strip().str.upper()
+    df = df[df['key'] != ""]
+    df['rank'] = df['kind'].map(KIND_RANKS)
+    # only the most reliable kind of each identifier is kept
+    df = df[df['rank'] == df.groupby('key')['rank'].transform('min')]
+    df = df.drop_duplicates(['key', 'id'])
+    df['weight'] = df['id'].map(weights).fillna(0) if weights else 0
+    df = df.sort_values(['key', 'weight', 'id'], ascending = [True, False, True])
+
+    n_candidates = df.groupby('key')['id'].transform('size')
+    ambiguous = df[n_candidates > 1].groupby('key')['id'].agg(",".join)
+    index = df.drop_duplicates('key').set_index('key')[['id', 'kind']]
+    index['candidates'] = ambiguous.reindex(index.index).fillna("")
+    return index
+
+def save_resolution_index(index, filename):
+    """
+    # Description
+    Saves a resolution index as a CSV file.
+
+    # Arguments
+    ``index`` (df): the index returned by get_resolution_index. \n
+    ``filename`` (string): the name of the CSV file.
+    """
+    index.to_csv(filename)
+    print("WROTE: %s" % filename)
+
+def load_resolution_index(filename):
+    """
+    # Description
+    Returns a resolution index saved as a CSV file.
+
+    # Arguments
+    ``filename`` (string): the name of the CSV file.
+
+    # Usage
+    >>> index = load_resolution_index("data/rdy2use/human_gene_index.csv")
+    """
+    return pd.read_csv(filename, index_col = 'key', dtype = str, keep_default_na = False)
+
+def resolve(index, identifiers):
+    """
+    # Description
+    Returns a table with the ``identifier``, UniProtKB ``id`` (missing if unresolved), ``kind`` and
+    ``candidates`` of each identifier of a list, resolved with a single lookup in the index.
+
+    # Arguments
+    ``index`` (df): the index returned by get_resolution_index. \n
+    ``identifiers`` (list of strings): symbols, synonyms or UniProtKB accessions.
+
+    # Usage
+    >>> print(resolve(index, ["igf1r", "JTK13", "FOO"]))
+    ... identifier      id     kind candidates
+    0      igf1r  P08069   symbol
+    1      JTK13  P08069  synonym
+    2        FOO     NaN      NaN        NaN
+    """
+    identifiers = pd.Series(list(identifiers), dtype = object)
+    position = index.index.get_indexer(identifiers.astype(str).str.strip().str.upper())
+    found = position >= 0
+    resolution = pd.DataFrame({'identifier': identifiers})
+    for col in ['id', 'kind', 'candidates']:
+        resolution[col] = np.where(found, index[col].to_numpy()[position], None)
+    return resolution
+
+def get_resolved_ids(resolution, report = True):
+    """
+    # Description
+    Returns the distinct UniProtKB IDs of a resolved list of identifiers, in the order of the list. \n
+    The unresolved and ambiguous identifiers are printed unless ``report`` is False.
+
+    # Arguments
+    ``resolution`` (df): the table returned by resolve. \n
+    ``report`` (boolean): print the unresolved and ambiguous identifiers.
+
+    # Usage
+    >>> genes = get_resolved_ids(resolve(index, genes))
+    ... UNRESOLVED (1): FOO
+    """
+    if report:
+        unresolved = resolution.loc[resolution['id'].isna(), 'identifier']
+        if len(unresolved):
+            print("UNRESOLVED (%s): %s" % (len(unresolved), ", ".join(map(str, unresolved))))
+        ambiguous = resolution[resolution['candidates'].fillna("") != ""]
+        if len(ambiguous):
+            print("AMBIGUOUS (%s): %s" % (len(ambiguous), ", ".join("%s -> %s (among %s)" % (
+                x, y, z) for x, y, z in zip(ambiguous['identifier'], ambiguous['id'], ambiguous['candidates']))))
+    return list(resolution['id'].dropna().drop_duplicates())
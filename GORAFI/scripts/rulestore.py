@@ -0,0 +1,195 @@
+"""
+Indexed SQLite store of the mined itemsets and association rules.
+
+The rules are written in batched transactions with their metrics, the ontologies of their antecedents
+and consequents, and one row per (term, side) in a separate table. The indexes on the terms, the
+ontology pairs, the support and the lift answer questions such as "all the rules involving
+R-HSA-168256" or "the GO -> HPO rules with a lift above 3" without scanning all the rules.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import sqlite3
+import pandas as pd
+from scripts.ontology import ONTOLOGY_NAMES
+
+def get_ontologies(itemset):
+    """
+    # Description
+    Returns the names of the ontologies of the terms of an itemset, sorted and joined by "+".
+
+    # Arguments
+    ``itemset`` (iterable of strings): the terms.
+
+    # Usage
+    >>> print(get_ontologies(frozenset(["R-HSA-168256", "GO:0006955", "GO:0002376"])))
+    ... GO+Reactome
+    """
+    return "+".join(sorted(set(ONTOLOGY_NAMES.get(t_id[:2], t_id[:2]) for t_id in itemset)))
+
+def save_rule_store(filename, rules, itemsets = None, batch_size = 50000):
+    """
+    # Description
+    Writes association rules, and optionally their itemsets, to an indexed SQLite file.
+
+    # Arguments
+    ``filename`` (string): the name of the SQLite file, overwritten if it exists. \n
+    ``rules`` (df): association rules from mlxtend, with frozensets of terms as antecedents and consequents,
+    and optionally the p-values columns. \n
+    ``itemsets`` (df): frequent itemsets from mlxtend. \n
+    ``batch_size`` (int): the number of rules written per transaction.
+
+    # Usage
+    >>> save_rule_store("rules.sqlite", rules, itemsets)
+    """
+    # the metrics are stored with underscores instead of spaces, e.g. antecedent_support
+    metrics = [c for c in rules.columns if c not in ("antecedents", "consequents")]
+    columns = [c.replace(" ", "_") for c in metrics]
+    con = sqlite3.connect(filename)
+    con.executescript("""
+        DROP TABLE IF EXISTS rules;
+        DROP TABLE IF EXISTS rule_terms;
+        DROP TABLE IF EXISTS itemsets;
+        DROP TABLE IF EXISTS itemset_terms;
+        CREATE TABLE rule_terms (term TEXT, side TEXT, rule_id INTEGER);
+        CREATE TABLE itemsets (id INTEGER PRIMARY KEY, itemsets TEXT, ontologies TEXT, length INTEGER, support REAL);
+        CREATE TABLE itemset_terms (term TEXT, itemset_id INTEGER);
+        """)
+    con.execute("CREATE TABLE rules (id INTEGER PRIMARY KEY, antecedents TEXT, consequents TEXT, "
+        "antecedent_ontologies TEXT, consequent_ontologies TEXT, %s)" % ", ".join("%s REAL" % c for c in columns))
+    insert = "INSERT INTO rules VALUES (%s)" % ", ".join("?" * (5 + len(columns)))
+
+    for start in range(0, len(rules), batch_size):
+        chunk = rules.iloc[start:start + batch_size]
+        rule_rows, term_rows = [], []
+        values = chunk[metrics].astype(float).itertuples(index = False)
+        for rule_id, a, c, v in zip(range(start, start + len(chunk)), chunk['antecedents'], chunk['consequents'], values):
+            rule_rows.append((rule_id, ",".join(sorted(a)), ",".join(sorted(c)), get_ontologies(a), get_ontologies(c)) + tuple(v))
+            term_rows.extend((t_id, "antecedent", rule_id) for t_id in a)
+            term_rows.extend((t_id, "consequent", rule_id) for t_id in c)
+        with con:
+            con.executemany(insert, rule_rows)
+            con.executemany("INSERT INTO rule_terms VALUES (?, ?, ?)", term_rows)
+
+    if itemsets is not None:
+        for start in range(0, len(itemsets), batch_size):
+            chunk = itemsets.iloc[start:start + batch_size]
+            ids = range(start, start + len(chunk))
+            with con:
+                con.executemany("INSERT INTO itemsets VALUES (?, ?, ?, ?, ?)", (
+                    (i, ",".join(sorted(s)), get_ontologies(s), len(s), float(sup))
+                    for i, s, sup in zip(ids, chunk['itemsets'], chunk['support'])))
+                con.executemany("INSERT INTO itemset_terms VALUES (?, ?)", (
+                    (t_id, i) for i, s in zip(ids, chunk['itemsets']) for t_id in s))
+
+    # the indexes are built once all the rows are written
+    with con:
+        con.executescript("""
+            CREATE INDEX rule_terms_term ON rule_terms (term, side);
+            CREATE INDEX rules_ontologies ON rules (antecedent_ontologies, consequent_ontologies, lift);
+            CREATE INDEX rules_support ON rules (support);
+            CREATE INDEX rules_lift ON rules (lift);
+            CREATE INDEX itemset_terms_term ON itemset_terms (term);
+            CREATE INDEX itemsets_support ON itemsets (support);
+            """)
+    con.close()
+    print("WROTE: %s" % filename)
+
+class RuleStore:
+    """
+    Queries on the itemsets and rules of a SQLite store.
+    """
+
+    def __init__(self, filename):
+        """
+        ``filename``: the name of the SQLite file written by save_rule_store. \n
+        ``columns``: the columns of the rules table.
+        """
+        self.filename = filename
+        self._con = sqlite3.connect(filename)
+        self.columns = [row[1] for row in self._con.execute("PRAGMA table_info(rules)")]
+
+    def close(self):
+        """Closes the connection to the store."""
+        self._con.close()
+
+    def get_rules(self, term = None, side = None, antecedent_ontologies = None, consequent_ontologies = None,
+                  min_support = None, min_confidence = None, min_lift = None, order_by = "lift", limit = None):
+        """
+        # Description
+        Returns the rules matching all the given conditions, sorted by decreasing ``order_by``.
+
+        # Arguments
+        ``term`` (string): a term of the rules. \n
+        ``side`` (string): "antecedent" or "consequent", the side of the rules the term is on. \n
+        ``antecedent_ontologies``, ``consequent_ontologies`` (string): the ontologies of the antecedents and
+        of the consequents, e.g. "GO", "HPO" or "GO+Reactome". \n
+        ``min_support``, ``min_confidence``, ``min_lift`` (float): minimum values of the rules metrics. \n
+        ``order_by`` (string): the metric the rules are sorted by. \n
+        ``limit`` (int): the maximum number of rules.
+
+        # Usage
+        >>> store = RuleStore("rules.sqlite")
+        >>> store.get_rules(term = "R-HSA-168256")
+        >>> store.get_rules(antecedent_ontologies = "GO", consequent_ontologies = "HPO", min_lift = 3)
+        """
+        if order_by not in self.columns:
+            raise ValueError("unknown rules column %s" % order_by)
+        where, params = [], []
+        if term is not None:
+            if side is None:
+                where.append("id IN (SELECT rule_id FROM rule_terms WHERE term = ?)")
+                params.append(term)
+            else:
+                where.append("id IN (SELECT rule_id FROM rule_terms WHERE term = ? AND side = ?)")
+                params.extend([term, side])
+        for column, value in [("antecedent_ontologies", antecedent_ontologies), ("consequent_ontologies", consequent_ontologies)]:
+            if value is not None:
+                where.append("%s = ?" % column)
+                params.append(value)
+        for column, value in [("support", min_support), ("confidence", min_confidence), ("lift", min_lift)]:
+            if value is not None:
+                where.append("%s >= ?" % column)
+                params.append(value)
+        query = "SELECT * FROM rules"
+        if where:
+            query += " WHERE %s" % " AND ".join(where)
+        query += " ORDER BY %s DESC" % order_by
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return pd.read_sql_query(query, self._con, params = params)
+
+    def get_itemsets(self, term = None, ontologies = None, min_support = None, limit = None):
+        """
+        # Description
+        Returns the itemsets matching all the given conditions, sorted by decreasing support.
+
+        # Arguments
+        ``term`` (string): a term of the itemsets. \n
+        ``ontologies`` (string): the ontologies of the itemsets, e.g. "GO+HPO". \n
+        ``min_support`` (float): minimum support of the itemsets. \n
+        ``limit`` (int): the maximum number of itemsets.
+
+        # Usage
+        >>> store.get_itemsets(term = "GO:0006955", min_support = 0.5)
+        """
+        where, params = [], []
+        if term is not None:
+            where.append("id IN (SELECT itemset_id FROM itemset_terms WHERE term = ?)")
+            params.append(term)
+        if ontologies is not None:
+            where.append("ontologies = ?")
+            params.append(ontologies)
+        if min_support is not None:
+            where.append("support >= ?")
+            params.append(min_support)
+        query = "SELECT * FROM itemsets"
+        if where:
+            query += " WHERE %s" % " AND ".join(where)
+        query += " ORDER BY support DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return pd.read_sql_query(query, self._con, params = params)
@@ -0,0 +1,191 @@
+"""
+Approximate frequent itemset mining on a random sample of the genes.
+
+Sampling:
+Hannu Toivonen (1996).
+Sampling Large Databases for Association Rules.
+Proceedings of the 22nd VLDB Conference.
+
+The sample size follows Hoeffding's inequality: with n sampled genes, the support of an itemset in
+the sample is within epsilon of its support in the whole list with a probability of at least 1 - delta.
+Itemsets are mined on the sample with a threshold lowered by epsilon, so that frequent itemsets are
+unlikely to be missed, and can be verified by one exact counting pass over all the genes.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import math
+import random
+import numpy as np
+import pandas as pd
+import scripts.wofptree as wofp
+from mlxtend.frequent_patterns import fpgrowth
+from mlxtend.preprocessing.transactionencoder import TransactionEncoder
+
+def get_sample_size(epsilon, delta, n_trans = None):
+    """
+    # Description
+    Returns the number of transactions to sample so that the support of an itemset is estimated
+    within epsilon with a probability of at least 1 - delta.
+
+    # Arguments
+    ``epsilon`` (float): the maximum error on the support. 0 < epsilon < 1. \n
+    ``delta`` (float): the probability of exceeding the error. 0 < delta < 1. \n
+    ``n_trans`` (int): the number of transactions available, the sample size cannot exceed it.
+
+    # Usage
+    >>> print(get_sample_size(0.02, 0.05))
+    ... 4612
+    """
+    n = math.ceil(math.log(2 / delta) / (2 * epsilon ** 2))
+    if n_trans is not None:
+        n = min(n, n_trans)
+    return n
+
+def get_error_bound(n, delta):
+    """
+    # Description
+    Returns the half-width of the support confidence interval for a sample of n transactions.
+
+    # Arguments
+    ``n`` (int): the sample size. \n
+    ``delta`` (float): the probability of exceeding the error. 0 < delta < 1.
+
+    # Usage
+    >>> print(get_error_bound(4612, 0.05))
+    ... 0.019998...
+    """
+    return math.sqrt(math.log(2 / delta) / (2 * n))
+
+def sample_transactions(trans_db, n, seed = None):
+    """
+    # Description
+    Returns the indexes of n transactions drawn at random without replacement, in their original order.
+
+    # Arguments
+    ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
+    ``n`` (int): the sample size. \n
+    ``seed``: the seed of the random generator.
+    """
+    return sorted(random.Random(seed).sample(range(len(trans_db)), n))
+
+def count_itemsets(trans_db, itemsets, weight_trans = None):
+    """
+    # Description
+    Returns the exact (weighted) support of each itemset, counted in one pass over the transactions.
+
+    # Arguments
+    ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
+    ``itemsets`` (list of iterables): the itemsets to count. \n
+    ``weight_trans`` (list): the respective weights of each transactions. Every transaction weighs 1 if None.
+
+    # Usage
+    >>> print(count_itemsets(trans, [{"GO1", "R-1"}, {"HP1"}]))
+    ... [0.4 0.4]
+    """
+    items = sorted(set(i for itemset in itemsets for i in itemset))
+    te = TransactionEncoder()
+    te.fit([items])
+    trans_bool = te.transform([[i for i in t if i in te.columns_mapping_] for t in trans_db])
+    if weight_trans is None:
+        weight_trans = np.ones(len(trans_db))
+    weight_trans = np.asarray(weight_trans, dtype = float)
+    supports = np.empty(len(itemsets))
+    for k, itemset in enumerate(itemsets):
+        cols = [te.columns_mapping_[i] for i in itemset]
+        supports[k] = weight_trans[trans_bool[:, cols].all(axis = 1)].sum()
+    return supports / weight_trans.sum()
+
+def approximate_fpgrowth(trans_db, min_support = 0.5, max_len = None, epsilon = 0.02, delta = 0.05,
+                         verify = False, seed = None):
+    """
+    # Description
+    Returns the frequent itemsets mined on a sample of the transactions, like mlxtend's fpgrowth with
+    ``use_colnames = True``, with the ``support_low`` and ``support_high`` bounds of their support. \n
+    Without verification, the itemsets whose support might reach ``min_support`` are kept. \n
+    With verification, the supports are exact and only the frequent itemsets are kept.
+
+    # Arguments
+    ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
+    ``min_support`` (float): the minimum support of the itemsets. 0 < min_support <= 1. \n
+    ``max_len`` (int): the maximum length of the itemsets. \n
+    ``epsilon`` (float): the maximum error on the supports. 0 < epsilon < 1. \n
+    ``delta`` (float): the probability of exceeding the error for an itemset. 0 < delta < 1. \n
+    ``verify`` (boolean): should the candidates be counted on all the transactions ? \n
+    ``seed``: the seed of the random generator.
+
+    # Usage
+    >>> itemsets = approximate_fpgrowth(transactions, min_support = 0.25, max_len = 2, epsilon = 0.02, verify = True)
+    >>> rules = association_rules(itemsets)
+    """
+    n = get_sample_size(epsilon, delta, len(trans_db))
+    sample = [trans_db[k] for k in sample_transactions(trans_db, n, seed)]
+    # the sample is the whole database when it is smaller than the required size
+    error = get_error_bound(n, delta) if n < len(trans_db) else 0
+
+    te = TransactionEncoder()
+    trans_bool = te.fit(sample).transform(sample)
+    df = pd.DataFrame(trans_bool, columns=te.columns_)
+    itemsets = fpgrowth(df, min_support = max(min_support - error, 1 / n), max_len = max_len, use_colnames = True)
+
+    if verify and error > 0:
+        itemsets['support'] = count_itemsets(trans_db, list(itemsets['itemsets']))
+        error = 0
+    itemsets = itemsets[itemsets['support'] + error >= min_support].reset_index(drop = True)
+    itemsets['support_low'] = (itemsets['support'] - error).clip(lower = 0)
+    itemsets['support_high'] = (itemsets['support'] + error).clip(upper = 1)
+    return itemsets
+
+def approximate_wofp(trans_db, weight_items, min_sup = 0.1, min_weight = 0.20, epsilon = 0.02, delta = 0.05,
+                     verify = False, seed = None):
+    """
+    # Description
+    Returns the weighted frequent patterns mined with a WOFP tree on a sample of the transactions,
+    as a data frame with the ``pattern`` (an (item, parent item) tuple), its ``weight`` and its ``weight_low`` and
+    ``weight_high`` bounds. \n
+    The weighted support error is scaled by the ratio between the heaviest and the average transaction.
+
+    # Arguments
+    ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
+    ``weight_items`` (dict): the items names as keys and their weights as values. \n
+    ``min_sup`` (float): the minimum support necessary to keep an item. 0 < min_sup <= 1. \n
+    ``min_weight`` (float): itemsets with a weight higher to this value (0<v<1) are considered patterns. \n
+    ``epsilon`` (float): the maximum error on the supports. 0 < epsilon < 1. \n
+    ``delta`` (float): the probability of exceeding the error for a pattern. 0 < delta < 1. \n
+    ``verify`` (boolean): should the candidates be weighed on all the transactions ? \n
+    ``seed``: the seed of the random generator.
+
+    # Usage
+    >>> w_items = {'GO1': 1, 'GO2': 1, 'R-1': 1, 'GO3': 1, 'R-2': 1, 'HP1': 1}
+    >>> print(approximate_wofp(trans, w_items, min_sup = 0.25, verify = True))
+    """
+    n = get_sample_size(epsilon, delta, len(trans_db))
+    index = sample_transactions(trans_db, n, seed)
+    sample = [trans_db[k] for k in index]
+    error = get_error_bound(n, delta) if n < len(trans_db) else 0
+
+    freq_items, weight_trans = wofp.get_frequency_and_weight(sample, weight_items, max(min_sup - error, 0))
+    if error > 0:
+        # a weighted support moves at most by the heaviest transaction over the average one
+        error = error * max(weight_trans) / np.mean(weight_trans)
+    fptree, item_nodes = wofp.construct_fptree(sample, freq_items, weight_trans)
+    pairs, weights = [], []
+    for item in item_nodes.keys():
+        cond_tree = wofp.get_condition_tree(item, fptree, item_nodes)
+        for parent_item in cond_tree.keys():
+            if cond_tree[parent_item] + error > min_weight:
+                pairs.append((item, parent_item))
+                weights.append(cond_tree[parent_item])
+    weights = np.array(weights)
+
+    if verify and error > 0 and pairs:
+        all_weight_trans = [wofp.weigh_transaction(t, weight_items) for t in trans_db]
+        weights = count_itemsets(trans_db, pairs, all_weight_trans)
+        error = 0
+    keep = weights + error > min_weight
+    return pd.DataFrame({
+        'pattern': [pair for pair, k in zip(pairs, keep) if k],
+        'weight': weights[keep],
+        'weight_low': np.clip(weights[keep] - error, 0, None),
+        'weight_high': np.clip(weights[keep] + error, None, 1)})
@@ -0,0 +1,208 @@
+"""
+Resident mining service answering gene list queries over a local HTTP API.
+
+The genes identifiers index, the annotations, the pruned terms and the enrichment background are loaded once.
+The rules of a query are cached in a bounded LRU cache keyed by the sorted UniProtKB IDs of the
+annotated genes and the mining parameters, so repeated queries are answered without mining.
+
+API:
+GET  /health  ->  {"status": "ok", "cache": {...}}
+POST /mine    <-  {"genes": ["IFIT1", ...], "min_support": 0.25, "max_len": 2, "metric": "confidence",
+                   "min_threshold": 0.8, "symbol": true}
+              ->  {"genes": 80, "unresolved": ["FLJ20035"], "annotated_genes": 78, "cached": false, "rules": [{...}, ...]}
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import json
+import threading
+import numpy as np
+import scripts.enrichment as enrich
+import scripts.mining as mining
+import scripts.resolver as resolver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from mlxtend.frequent_patterns import association_rules
+
+class RuleCache:
+    """
+    Bounded least recently used cache, safe to share between threads.
+    """
+
+    def __init__(self, maxsize = 256):
+        """
+        ``maxsize``: the maximum number of cached results. \n
+        ``hits``, ``misses``: the number of cache lookups that found or missed a result.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Returns the number of cached results."""
+        return len(self._data)
+
+    def get(self, key):
+        """Returns the result cached for a key and marks it as recently used, or None."""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        """Caches a result, evicting the least recently used one if the cache is full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last = False)
+
+class MiningService:
+    """
+    Loaded mining state and cached query answering.
+    """
+
+    def __init__(self, annotation, pruned_terms, gene_index = None, background = None,
+                 defaults = None, cache_size = 256):
+        """
+        ``annotation``: the genes ids and their terms per ontology. \n
+        ``pruned_terms``: terms left out of the transactions. \n
+        ``gene_index``: the resolution index of the genes identifiers, needed for queries by symbol. \n
+        ``background``: the enrichment background of the species, None to skip the enrichment. \n
+        ``defaults``: the mining parameters used when a query omits them. \n
+        ``cache``: the RuleCache of the answered queries.
+        """
+        self.annotation = annotation
+        self.pruned_terms = pruned_terms
+        self.gene_index = gene_index
+        self.background = background
+        self.defaults = {'min_support': 0.25, 'max_len': 2, 'metric': "confidence", 'min_threshold': 0.8, 'symbol': True}
+        self.defaults.update(defaults or {})
+        self.cache = RuleCache(cache_size)
+
+    def get_params(self, query):
+        """Returns the mining parameters of a query, completed with the defaults."""
+        params = dict(self.defaults)
+        params.update((k, query[k]) for k in self.defaults.keys() if k in query)
+        params['min_support'] = float(params['min_support'])
+        params['min_threshold'] = float(params['min_threshold'])
+        params['max_len'] = None if params['max_len'] is None else int(params['max_len'])
+        return params
+
+    def mine(self, query):
+        """
+        # Description
+        Returns the JSON encoded answer to a query: the number of genes, the unresolved ones, and the rules
+        of the annotated ones.
+
+        # Arguments
+        ``query`` (dict): the ``genes`` and optionally the mining parameters.
+
+        # Usage
+        >>> service = MiningService(annotation, pruned_terms, gene_index)
+        >>> print(service.mine({"genes": ["IFIT1", "OAS1", "MX1"], "min_support": 0.5}))
+        """
+        params = self.get_params(query)
+        genes = query['genes']
+        unresolved = []
+        if params['symbol']:
+            resolution = resolver.resolve(self.gene_index, genes)
+            genes = resolver.get_resolved_ids(resolution, report = False)
+            unresolved = list(resolution.loc[resolution['id'].isna(), 'identifier'])
+        annotated = tuple(sorted(set(genes).intersection(self.annotation.keys())))
+        key = (annotated, params['min_support'], params['max_len'], params['metric'], params['min_threshold'])
+
+        rules = self.cache.get(key)
+        cached = rules is not None
+        if not cached:
+            rules = self.get_rules(annotated, params)
+            self.cache.put(key, rules)
+        # the rules are cached as an encoded JSON array
+        return '{"genes": %s, "unresolved": %s, "annotated_genes": %s, "cached": %s, "rules": %s}' % (
+            len(query['genes']), json.dumps(unresolved), len(annotated), json.dumps(cached), rules)
+
+    def get_rules(self, genes, params):
+        """Returns the JSON encoded rules mined from annotated genes."""
+        gene_transactions = mining.get_gene_transactions(genes, self.annotation, self.pruned_terms)
+        if not gene_transactions:
+            return "[]"
+        itemsets = mining.mine_itemsets(list(gene_transactions.values()), params['min_support'], params['max_len'])
+        if itemsets.empty:
+            return "[]"
+        rules = association_rules(itemsets, metric = params['metric'], min_threshold = params['min_threshold'])
+        if self.background is not None:
+            rules = enrich.add_enrichment_pvalues(rules, self.background, len(gene_transactions))
+        # infinite values (e.g. conviction) are not valid JSON
+        rules = mining.format_rules(rules).replace([np.inf, -np.inf], np.nan)
+        rules = rules.astype(object).where(rules.notna(), None)
+        return json.dumps(rules.to_dict(orient = "records"))
+
+def make_handler(service):
+    """
+    # Description
+    Returns a request handler class answering the HTTP API with a MiningService.
+
+    # Arguments
+    ``service`` (MiningService): the loaded mining service.
+    """
+
+    class MiningHandler(BaseHTTPRequestHandler):
+        """Answers GET /health and POST /mine requests."""
+
+        def send_json(self, code, body):
+            body = body.encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self.send_json(404, json.dumps({'error': "unknown path %s" % self.path}))
+            self.send_json(200, json.dumps({'status': "ok", 'cache': {
+                'size': len(service.cache), 'hits': service.cache.hits, 'misses': service.cache.misses}}))
+
+        def do_POST(self):
+            if self.path != "/mine":
+                return self.send_json(404, json.dumps({'error': "unknown path %s" % self.path}))
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                query = json.loads(self.rfile.read(length))
+                if not isinstance(query.get('genes'), list):
+                    raise ValueError("the query needs a list of genes")
+                body = service.mine(query)
+            except (ValueError, TypeError, AttributeError) as err:
+                return self.send_json(400, json.dumps({'error': str(err)}))
+            self.send_json(200, body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MiningHandler
+
+def serve(service, host = "127.0.0.1", port = 8642):
+    """
+    # Description
+    Returns a threaded HTTP server answering the API with a MiningService. Call its serve_forever method
+    to start it, and its shutdown method from another thread to stop it.
+
+    # Arguments
+    ``service`` (MiningService): the loaded mining service. \n
+    ``host`` (string): the address to listen on. \n
+    ``port`` (int): the port to listen on, 0 picks a free one.
+
+    # Usage
+    >>> server = serve(service, port = 0)
+    >>> threading.Thread(target = server.serve_forever, daemon = True).start()
+    >>> print(server.server_address)
+    ... ('127.0.0.1', 41023)
+    """
+    return ThreadingHTTPServer((host, port), make_handler(service))
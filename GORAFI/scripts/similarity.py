@@ -0,0 +1,229 @@
+"""
+Clustering of the association rules by the semantic similarity of their terms.
+
+The ancestors of each term are cached as one integer with a bit per term, the terms being ordered by
+decreasing information content: the most informative common ancestor of two terms is the lowest bit set
+in both of their integers, found without walking the ontologies. The Resnik or
+Lin similarities of the terms of the rules are computed once per pair of terms, and two rules are
+compared with the best-match average of their terms within each ontology. The rules are then grouped
+by average linkage hierarchical clustering. The similarities of two rules only depend on their terms, so the
+rules sharing the same terms are clustered once, through their itemset.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.cluster.hierarchy import linkage, fcluster
+from scipy.spatial.distance import squareform
+
+MEASURES = ["resnik", "lin"]
+
+class AncestorIndex:
+    """
+    Cached ancestors, most informative common ancestors and similarities of the terms of the ontologies.
+    """
+
+    def __init__(self, metadata):
+        """
+        ``metadata``: a table of terms with their ``id``, ``ic`` and comma separated ``parents``, as returned by
+        termstore.TermStore.get_terms. The terms missing from the table are ignored when found as parents. \n
+        ``position``: the terms and their bits, by decreasing information content. \n
+        ``ic``: the information content of the terms, by position. The missing values are set to 0.
+        """
+        terms = metadata.assign(ic = metadata['ic'].fillna(0)).sort_values('ic', ascending = False, kind = 'stable')
+        self.position = dict(zip(terms['id'], range(len(terms))))
+        self.ic = terms['ic'].to_numpy(dtype = float)
+        self._parents = dict((t_id, [p for p in parents.split(",") if p in self.position] if parents else [])
+            for t_id, parents in zip(terms['id'], terms['parents']))
+        self._ancestors = {}
+        self._mica = {}
+
+    def get_ancestors(self, t_id):
+        """
+        # Description
+        Returns the bitset of a term and of all its ancestors.
+
+        # Arguments
+        ``t_id`` (string): the id of the term.
+        """
+        if t_id in self._ancestors:
+            return self._ancestors[t_id]
+        # the ancestors are resolved depth first, without recursion
+        stack = [t_id]
+        while stack:
+            term = stack[-1]
+            missing = [p for p in self._parents[term] if p not in self._ancestors]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            bits = 1 << self.position[term]
+            for p in self._parents[term]:
+                bits |= self._ancestors[p]
+            self._ancestors[term] = bits
+        return self._ancestors[t_id]
+
+    def get_mica(self, a, b):
+        """
+        # Description
+        Returns the position of the most informative common ancestor of two terms, None if they share none.
+
+        # Arguments
+        ``a``, ``b`` (string): the ids of the terms.
+        """
+        key = (a, b) if a <= b else (b, a)
+        if key not in self._mica:
+            common = self.get_ancestors(a) & self.get_ancestors(b)
+            self._mica[key] = (common & -common).bit_length() - 1 if common else None
+        return self._mica[key]
+
+    def get_similarity(self, a, b, measure = "lin"):
+        """
+        # Description
+        Returns the similarity of two terms, between 0 and 1: the information content of their most
+        informative common ancestor (Resnik), divided by the highest information content of the ontologies,
+        or divided by the mean information content of the two terms (Lin).
+
+        # Arguments
+        ``a``, ``b`` (string): the ids of the terms. \n
+        ``measure`` (string): "resnik" or "lin".
+
+        # Usage
+        >>> index = AncestorIndex(store.get_terms(gene_terms))
+        >>> print(index.get_similarity("GO:0006955", "GO:0002376"))
+        ... 0.6731
+        """
+        if a == b:
+            return 1.0
+        mica = self.get_mica(a, b)
+        if mica is None:
+            return 0.0
+        if measure == "resnik":
+            return self.ic[mica] / self.ic[0] if self.ic[0] > 0 else 0.0
+        total = self.ic[self.position[a]] + self.ic[self.position[b]]
+        return 2 * self.ic[mica] / total if total > 0 else 0.0
+
+def get_rule_itemsets(rules):
+    """
+    # Description
+    Returns the distinct itemsets of the rules (their antecedents and consequents together), and the position
+    of the itemset of each rule.
+
+    # Arguments
+    ``rules`` (df): association rules from mlxtend.
+
+    # Usage
+    >>> itemsets, positions = get_rule_itemsets(rules)
+    >>> print(len(rules), len(itemsets))
+    ... 37242 13859
+    """
+    positions, uniques = pd.factorize(pd.Series([a | c for a, c in zip(rules['antecedents'], rules['consequents'])],
+        dtype = object))
+    return list(uniques), positions
+
+def get_itemset_similarities(itemsets, index, measure = "lin"):
+    """
+    # Description
+    Returns the matrix of the similarities of itemsets, between 0 and 1. \n
+    Within an ontology, each term of an itemset is matched with its most similar term of the other itemset, and
+    the similarities of the best matches of both itemsets are averaged. The similarity of two itemsets is the mean
+    of these averages over the ontologies of their terms, an ontology found in a single itemset counting as 0.
+
+    # Arguments
+    ``itemsets`` (list of frozensets): the terms of each itemset. \n
+    ``index`` (AncestorIndex): the index of the terms of the itemsets. \n
+    ``measure`` (string): "resnik" or "lin".
+
+    # Usage
+    >>> similarities = get_itemset_similarities(get_rule_itemsets(rules)[0], index)
+    >>> print(similarities.shape)
+    ... (2417, 2417)
+    """
+    n_sets = len(itemsets)
+    shared = np.zeros((n_sets, n_sets))
+    n_ontologies = np.zeros((n_sets, n_sets), dtype = np.uint8)
+    for prefix in sorted(set(t_id[:2] for terms in itemsets for t_id in terms)):
+        terms = sorted(set(t_id for t in itemsets for t_id in t if t_id[:2] == prefix))
+        column = dict((t_id, i) for i, t_id in enumerate(terms))
+        sim = np.eye(len(terms))
+        for i in range(len(terms)):
+            for j in range(i + 1, len(terms)):
+                sim[i, j] = sim[j, i] = index.get_similarity(terms[i], terms[j], measure)
+        # itemsets x terms incidence matrix, and best match of every term in each itemset
+        cols = [[column[t_id] for t_id in t if t_id[:2] == prefix] for t in itemsets]
+        rows = np.repeat(np.arange(n_sets), [len(c) for c in cols])
+        incidence = sp.csr_matrix((np.ones(len(rows)), (rows, np.concatenate(cols + [[]]).astype(int))),
+            shape = (n_sets, len(terms)))
+        best = np.array([sim[:, c].max(axis = 1) if c else np.zeros(len(terms)) for c in cols])
+        n_terms = np.array([len(c) for c in cols], dtype = float)
+        present = n_terms > 0
+        # mean similarity of the terms of itemset i with their best matches in itemset j, averaged in place
+        mean_best = np.asarray(incidence @ best.T) / np.maximum(n_terms, 1)[:, None]
+        mean_best += mean_best.T
+        mean_best /= 2
+        mean_best[~present, :] = 0
+        mean_best[:, ~present] = 0
+        shared += mean_best
+        del mean_best
+        n_ontologies += np.logical_or.outer(present, present)
+    shared /= np.maximum(n_ontologies, 1)
+    np.fill_diagonal(shared, 1)
+    return shared
+
+def get_rule_similarities(rules, index, measure = "lin"):
+    """
+    # Description
+    Returns the matrix of the similarities of the rules, between 0 and 1: the similarities of their itemsets,
+    as computed by get_itemset_similarities.
+
+    # Arguments
+    ``rules`` (df): association rules from mlxtend. \n
+    ``index`` (AncestorIndex): the index of the terms of the rules. \n
+    ``measure`` (string): "resnik" or "lin".
+
+    # Usage
+    >>> similarities = get_rule_similarities(rules, index)
+    >>> print(similarities.shape)
+    ... (2417, 2417)
+    """
+    itemsets, positions = get_rule_itemsets(rules)
+    return get_itemset_similarities(itemsets, index, measure)[np.ix_(positions, positions)]
+
+def cluster_rules(rules, index, measure = "lin", threshold = 0.5, max_itemsets = None):
+    """
+    # Description
+    Returns the rules with the ``cluster`` they belong to: the itemsets of the rules are grouped by average
+    linkage, so that the mean similarity of the itemsets of two merged groups is at least the threshold, and
+    the rules of the same itemset share its cluster. \n
+    The similarities are held in dense matrices of the squared number of distinct itemsets.
+
+    # Arguments
+    ``rules`` (df): association rules from mlxtend. \n
+    ``index`` (AncestorIndex): the index of the terms of the rules. \n
+    ``measure`` (string): "resnik" or "lin". \n
+    ``threshold`` (float): the minimum similarity of the rules of a cluster, between 0 and 1. \n
+    ``max_itemsets`` (int): the maximum number of distinct itemsets, a ValueError is raised above it
+    instead of running out of memory. None for no limit.
+
+    # Usage
+    >>> rules = cluster_rules(rules, AncestorIndex(store.get_terms(gene_terms)), threshold = 0.5)
+    >>> print(rules['cluster'].nunique())
+    ... 312
+    """
+    if measure not in MEASURES:
+        raise ValueError("unknown similarity measure %s, expected one of %s" % (measure, MEASURES))
+    rules = rules.copy()
+    itemsets, positions = get_rule_itemsets(rules)
+    if max_itemsets is not None and len(itemsets) > max_itemsets:
+        raise ValueError("%s distinct rule itemsets to cluster, above the maximum of %s" % (len(itemsets), max_itemsets))
+    if len(itemsets) < 2:
+        rules['cluster'] = 1
+        return rules
+    distances = 1 - get_itemset_similarities(itemsets, index, measure)
+    distances = squareform(np.clip(distances, 0, 1, out = distances), checks = False)
+    clusters = fcluster(linkage(distances, method = "average"), t = 1 - threshold, criterion = "distance")
+    rules['cluster'] = clusters[positions]
+    return rules
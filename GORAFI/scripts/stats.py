@@ -0,0 +1,32 @@
+"""
+Statistical functions shared by the significance and enrichment stages.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import numpy as np
+
+def get_bh_qvalues(pvalues):
+    """
+    # Description
+    Returns the Benjamini-Hochberg q-values (false discovery rates) of an array of p-values.
+
+    # Arguments
+    ``pvalues`` (array-like): the p-values.
+
+    # Usage
+    >>> print(get_bh_qvalues([0.01, 0.04, 0.03, 0.2]))
+    ... [0.04       0.05333333 0.05333333 0.2       ]
+    """
+    pvalues = np.asarray(pvalues, dtype = float)
+    n = len(pvalues)
+    if n == 0:
+        return pvalues
+    order = np.argsort(pvalues)
+    ranked = pvalues[order] * n / np.arange(1, n + 1)
+    # enforce monotonicity from the largest p-value down
+    qvalues = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1)
+    result = np.empty(n)
+    result[order] = qvalues
+    return result
@@ -0,0 +1,127 @@
+"""
+Synthetic ontologies and annotations shaped like GO, Reactome and HPO, for offline benchmarks.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import random
+from scripts.reactome import REACTerm
+
+# approximate shape of the real ontologies:
+# number of terms, depth, average number of parents per term, fraction of the genes annotated,
+# average leaf annotations per annotated gene.
+SHAPES = {
+    'GO': {'prefix': "GO:%07d", 'namespace': "biological_process", 'n_terms': 28000, 'depth': 12, 'fan_in': 1.6,
+           'coverage': 0.9, 'per_gene': 8},
+    'Reactome': {'prefix': "R-HSA-%d", 'namespace': "Pathway", 'n_terms': 2500, 'depth': 8, 'fan_in': 1.05,
+                 'coverage': 0.55, 'per_gene': 6},
+    'HPO': {'prefix': "HP:%07d", 'namespace': "human_phenotype", 'n_terms': 16000, 'depth': 12, 'fan_in': 1.3,
+            'coverage': 0.25, 'per_gene': 20}
+}
+
+def get_layers(n_terms, depth):
+    """
+    # Description
+    Returns the number of terms at each level of a synthetic ontology, growing geometrically from a single root.
+
+    # Arguments
+    ``n_terms`` (int): the number of terms. \n
+    ``depth`` (int): the number of levels below the root.
+
+    # Usage
+    >>> print(get_layers(100, 4))
+    ... [1, 10, 17, 27, 43]
+    """
+    weights = [1.6 ** level for level in range(1, depth + 1)]
+    layers = [1] + [max(1, int((n_terms - 1) * w / sum(weights))) for w in weights]
+    return layers
+
+def make_dag(prefix, namespace, n_terms, depth, fan_in, seed = None):
+    """
+    # Description
+    Returns a dictionary of terms forming a rooted DAG. A term has ``fan_in`` parents on average,
+    mostly on the level above and sometimes higher, like the shortcuts of GO.
+
+    # Arguments
+    ``prefix`` (string): the format of the terms ids, e.g. "GO:%07d". \n
+    ``namespace`` (string): the namespace of the terms. \n
+    ``n_terms`` (int): the approximate number of terms. \n
+    ``depth`` (int): the number of levels below the root. \n
+    ``fan_in`` (float): the average number of parents of a term, at least 1. \n
+    ``seed``: the seed of the random generator.
+
+    # Usage
+    >>> dag = make_dag("GO:%07d", "biological_process", 1000, 8, 1.6, seed = 0)
+    >>> onto.save_as_obo(dag, "synthetic_go.obo", "ontology: go")
+    """
+    rng = random.Random(seed)
+    terms = {}
+    levels = []
+    n = 0
+    for level, size in enumerate(get_layers(n_terms, depth)):
+        ids = []
+        for _ in range(size):
+            t_id = prefix % n
+            n += 1
+            parents = set()
+            # geometric number of parents with a mean of fan_in
+            while level > 0 and (not parents or rng.random() < 1 - 1 / fan_in):
+                # 80% of the parents are on the level right above
+                up = 1 if rng.random() < 0.8 else rng.randint(1, level)
+                parents.add(rng.choice(levels[level - up]))
+            terms[t_id] = REACTerm(t_id, "synthetic term %s" % n, namespace, parents)
+            ids.append(t_id)
+        levels.append(ids)
+    return terms
+
+def write_reactome_files(terms, hier_path, labl_path, species = "Homo sapiens"):
+    """
+    # Description
+    Writes a synthetic DAG as Reactome hierarchy and label files, readable by reactome.load_reacterm_dict.
+
+    # Arguments
+    ``terms`` (dict): the terms returned by make_dag. \n
+    ``hier_path`` (string): path of the hierarchy file. \n
+    ``labl_path`` (string): path of the label file. \n
+    ``species`` (string): the species written on the label file.
+    """
+    with open(hier_path, 'wt') as rh:
+        for t_id in terms.keys():
+            for par in sorted(terms[t_id]._parents):
+                rh.write("%s\t%s\n" % (par, t_id))
+    with open(labl_path, 'wt') as rl:
+        for t_id in terms.keys():
+            rl.write("%s\t%s\t%s\n" % (t_id, terms[t_id].name, species))
+
+def make_annotation(dags, n_genes, shapes = SHAPES, seed = None):
+    """
+    # Description
+    Returns a synthetic leaf annotation per ontology: a dict with the ontologies names as keys and dicts
+    of genes ids and their annotated terms as values. Each ontology annotates a fraction of the genes,
+    and terms are drawn with a skewed popularity, as few terms annotate many genes on the real annotations.
+
+    # Arguments
+    ``dags`` (dict): the ontologies names and their terms. \n
+    ``n_genes`` (int): the number of genes. \n
+    ``shapes`` (dict): the ontologies names and their ``coverage`` and ``per_gene`` values. \n
+    ``seed``: the seed of the random generator.
+
+    # Usage
+    >>> annotation = make_annotation({'GO': go_dag}, 2000, seed = 0)
+    >>> print(annotation['GO']['P00001'])
+    ... {'GO:0001543', ...}
+    """
+    rng = random.Random(seed)
+    annotation = {}
+    for name in dags.keys():
+        ids = sorted(dags[name].keys())
+        # Zipf-like popularity of the terms
+        weights = [1 / (1 + rank) ** 0.8 for rank in range(len(ids))]
+        rng.shuffle(weights)
+        annotation[name] = {}
+        for g in range(n_genes):
+            if rng.random() < shapes[name]['coverage']:
+                k = max(1, int(rng.expovariate(1 / shapes[name]['per_gene'])))
+                annotation[name]["P%05d" % g] = set(rng.choices(ids, weights = weights, k = k))
+    return annotation
@@ -0,0 +1,127 @@
+"""
+Indexed SQLite store of the ontologies terms and of the genes annotations of a species.
+
+The terms (ontology, namespace, name, depth, level, number of annotated genes, information content, weight
+and parents) and the annotations are indexed by their ids, so that a query only reads the records of its
+genes and of the terms they reference instead of loading whole ontologies and annotation files.
+
+@ July 2021
+@ Asloudj Yanis
+"""
+
+import sqlite3
+import pandas as pd
+
+TERM_FIELDS = ["id", "ontology", "namespace", "name", "depth", "level", "n_genes", "ic", "weight", "parents"]
+
+# maximum number of ids bound to a single query:
+CHUNK_SIZE = 500
+
+def build_term_store(filename, metadata, ontologies, annotation):
+    """
+    # Description
+    Writes the terms metadata, names and parents, and the genes annotations to a SQLite file.
+
+    # Arguments
+    ``filename`` (string): the name of the SQLite file, overwritten if it exists. \n
+    ``metadata`` (df): the table returned by ontology.get_term_metadata, with the ``weight`` of the terms
+    (1 if missing). \n
+    ``ontologies`` (dict of GODag objects): ontologies as values and their terms' first 2 characters as keys. \n
+    ``annotation`` (dict): the genes ids and their terms per ontology, as in the rdy2use annotation file.
+
+    # Usage
+    >>> build_term_store("data/rdy2use/human_ontology.sqlite", metadata, ontologies, rdy2use_data)
+    """
+    con = sqlite3.connect(filename)
+    con.executescript("""
+        DROP TABLE IF EXISTS terms;
+        DROP TABLE IF EXISTS annotation;
+        CREATE TABLE terms (id TEXT PRIMARY KEY, ontology TEXT, namespace TEXT, name TEXT,
+            depth INTEGER, level INTEGER, n_genes INTEGER, ic REAL, weight REAL, parents TEXT) WITHOUT ROWID;
+        CREATE TABLE annotation (gene_id TEXT, ontology TEXT, terms TEXT);
+        """)
+
+    def iter_terms():
+        for row in metadata.itertuples(index = False):
+            term = ontologies[row.id[:2]][row.id]
+            ic = None if pd.isna(row.ic) else float(row.ic)
+            yield (row.id, row.ontology, row.namespace, term.name, int(row.depth), int(row.level),
+                int(row.n_genes), ic, float(getattr(row, 'weight', 1)), ",".join(sorted(term._parents)))
+
+    def iter_annotation():
+        for gene_id, gene_anno in annotation.items():
+            for name, ids in gene_anno.items():
+                yield gene_id, name, ",".join(ids)
+
+    with con:
+        con.executemany("INSERT INTO terms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", iter_terms())
+        con.executemany("INSERT INTO annotation VALUES (?, ?, ?)", iter_annotation())
+        # the ontologies of a gene keep the order of the annotation file
+        con.execute("CREATE INDEX annotation_gene ON annotation (gene_id)")
+    con.close()
+    print("WROTE: %s" % filename)
+
+class TermStore:
+    """
+    Random access by id to the terms and to the annotations of a SQLite store.
+    """
+
+    def __init__(self, filename):
+        """
+        ``filename``: the name of the SQLite file written by build_term_store. \n
+        ``columns``: the columns of the terms table.
+        """
+        self.filename = filename
+        self._con = sqlite3.connect(filename)
+        self.columns = [row[1] for row in self._con.execute("PRAGMA table_info(terms)")]
+
+    def close(self):
+        """Closes the connection to the store."""
+        self._con.close()
+
+    def iter_chunks(self, query, ids):
+        """Yields the rows returned by a query with an IN (?) clause, run on chunks of ids."""
+        ids = list(ids)
+        for i in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[i:i + CHUNK_SIZE]
+            yield from self._con.execute(query % ",".join("?" * len(chunk)), chunk)
+
+    def get_terms(self, term_ids = None):
+        """
+        # Description
+        Returns the records of terms as a table with the columns of ontology.get_term_metadata, and their
+        ``name``, ``weight`` and comma separated ``parents``. The ids missing from the store are ignored.
+
+        # Arguments
+        ``term_ids`` (iterable of strings): the ids of the terms, None for all the terms.
+
+        # Usage
+        >>> store = TermStore("data/rdy2use/human_ontology.sqlite")
+        >>> print(store.get_terms(["GO:0008150"]).iloc[0]['depth'])
+        ... 0
+        """
+        if term_ids is None:
+            rows = self._con.execute("SELECT * FROM terms")
+        else:
+            rows = self.iter_chunks("SELECT * FROM terms WHERE id IN (%s)", term_ids)
+        return pd.DataFrame(list(rows), columns = self.columns)
+
+    def get_annotation(self, gene_ids):
+        """
+        # Description
+        Returns the annotations of genes, as the rdy2use annotation file restricted to these genes.
+        The ids missing from the store are ignored.
+
+        # Arguments
+        ``gene_ids`` (iterable of strings): the UniProtKB IDs of the genes.
+
+        # Usage
+        >>> annotation = store.get_annotation(["P08069", "P05019"])
+        >>> print(annotation['P08069'].keys())
+        ... dict_keys(['GO', 'Reactome', 'HPO'])
+        """
+        annotation = {}
+        for gene_id, name, terms in self.iter_chunks(
+                "SELECT gene_id, ontology, terms FROM annotation WHERE gene_id IN (%s) ORDER BY rowid", set(gene_ids)):
+            annotation.setdefault(gene_id, {})[name] = terms.split(",") if terms else []
+        return annotation
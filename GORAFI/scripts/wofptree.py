@@ -19,7 +19,8 @@ from collections import Counter, OrderedDict
 def weigh_transaction(trans, weight_items):
     """
     # Description
-    Calculates the average weight of a transaction according to the individual weights of the items.
+    Calculates the average weight of a transaction according to the individual weights of the items. \n
+    An empty transaction weighs 0.
 
     # Arguments
     ``trans`` (list): a transaction. Each element is an item. \n
@@ -31,6 +32,8 @@ def weigh_transaction(trans, weight_items):
     >>> print(weigh_transaction(t, weight))
     ... 3.75
     """
+    if not trans:
+        return 0
     total = 0
     for item in trans:
         total += weight_items[item]
@@ -106,7 +109,7 @@ def order_transaction(trans, freq_items):
     frequent_trans = [x for x in trans if x in order]
     return sorted(frequent_trans, key = order.index)
 
-def construct_fptree(trans_db, freq_items, weight_trans):
+def construct_fptree(trans_db, freq_items, weight_trans, total_weight = None):
     """
     # Description
     Returns an FP tree and a dict of items and their nids from the transactions stored in a database.
@@ -114,7 +117,8 @@ def construct_fptree(trans_db, freq_items, weight_trans):
     # Arguments
     ``trans_db`` (list of sublists): your transaction database. A sublist is a transaction with its items. \n
     ``freq_items`` (df): the items names and their frequencies, ordered by descending frequency and ascending name. \n
-    ``weight_items`` (list): a list with the respective weights of each transactions.
+    ``weight_trans`` (list): a list with the respective weights of each transactions. \n
+    ``total_weight`` (float): the weight the nodes are normalized by. Defaults to the sum of ``weight_trans``.
 
     # Usage
     >>> trans = [
@@ -151,11 +155,11 @@ def construct_fptree(trans_db, freq_items, weight_trans):
     tree.create_node(tag="", identifier=0)
     nid = 1 # node id
 
-    # weights counter
-    k = 0
-    total_weight = sum(trans_weights)
+    # normalization weight
+    if total_weight is None:
+        total_weight = sum(weight_trans)
 
-    for t in trans_db:
+    for k, t in enumerate(trans_db):
         parent_nid = 0
         t = order_transaction(t, freq_items)
 
@@ -165,12 +169,12 @@ def construct_fptree(trans_db, freq_items, weight_trans):
             children_nids = tree.is_branch(parent_nid)
 
             # if there is no node child corresponding to the item, add it on the tree and save the new nid in the dict
-            if not any(nid in item_nodes[item] for nid in children_nids):
+            if not any(nid in item_nodes.get(item, []) for nid in children_nids):
                 try:
                     item_nodes[item].append(nid)
                 except KeyError:
                     item_nodes[item] = [nid]
-                tree.create_node(tag=item, identifier=nid, parent=parent_nid, data = trans_weights[k] / total_weight)
+                tree.create_node(tag=item, identifier=nid, parent=parent_nid, data = weight_trans[k] / total_weight)
 
                 # generate a new unique nid and navigate to the new node
                 parent_nid = nid
@@ -179,7 +183,7 @@ def construct_fptree(trans_db, freq_items, weight_trans):
             # if there is, update the weight of the node and navigate to it
             else:
                 parent_nid = min(set(item_nodes[item]).intersection(set(children_nids)))
-                tree[parent_nid].data += trans_weights[k] / total_weight
+                tree[parent_nid].data += weight_trans[k] / total_weight
 
     return tree, item_nodes
 
@@ -247,7 +251,8 @@ def get_condition_tree(item, fptree, item_nodes):
 def get_association_rules(fptree, item_nodes, min_weight = 0.20):
     """
     # Description
-    Returns the items association rules by reading the FPtree.
+    Returns the items association rules by reading the FPtree, as a dict with the (item, parent item) pairs
+    as keys and their weights as values.
 
     # Arguments
     ``fptree`` (Tree Object): items nodes and their weights stored in a treelib Tree Object.
@@ -267,14 +272,12 @@ def get_association_rules(fptree, item_nodes, min_weight = 0.20):
     >>> tree, item_nodes = construct_fptree(trans, freq_items, trans_weights)
     >>> get_association_rules(tree, item_nodes, min_weight = 0.5)
     """
-    item_nodes.popitem(last=False)
     frequent_pattern = {}
     for item in item_nodes.keys():
         cond_tree = get_condition_tree(item, fptree, item_nodes)
         for parent_item in cond_tree.keys():
             if cond_tree[parent_item] > min_weight:
-                pattern = "%s:%s" % (item, parent_item)
-                frequent_pattern[pattern] = round(cond_tree[parent_item], 2)
+                frequent_pattern[(item, parent_item)] = round(cond_tree[parent_item], 2)
     return frequent_pattern
 
 def filter_patterns(freq_pat, fix_length = 2):
@@ -283,7 +286,7 @@ def filter_patterns(freq_pat, fix_length = 2):
     Returns a dict of frequent patterns after filtering according to items prefix or suffix.
 
     # Arguments
-    ``freq_pat`` (dict): frequent patterns and their associated weight value.
+    ``freq_pat`` (dict): frequent (item, parent item) patterns and their associated weight value.
     ``fix_length`` (int): the length of the suffix or prefix.
 
     # Usage
@@ -299,35 +302,34 @@ def filter_patterns(freq_pat, fix_length = 2):
     >>> tree, item_nodes = construct_fptree(trans, freq_items, trans_weights)
     >>> asso_rules = get_association_rules(tree, item_nodes)
     >>> print(asso_rules)
-    ... {'GO1:R-1': 0.4, 'GO2:GO1': 0.4, 'GO2:R-1': 0.4, 'GO3:R-1': 0.4, 'HP1:GO2': 0.4}
+    ... {('GO1', 'R-1'): 0.4, ('GO2', 'GO1'): 0.4, ('GO2', 'R-1'): 0.4, ('GO3', 'R-1'): 0.4, ('HP1', 'GO2'): 0.4}
     >>> print(filter_patterns(asso_rules))
-    ... {'GO1:R-1': 0.4, 'GO2:R-1': 0.4, 'GO3:R-1': 0.4, 'HP1:GO2': 0.4}
+    ... {('GO1', 'R-1'): 0.4, ('GO2', 'R-1'): 0.4, ('GO3', 'R-1'): 0.4, ('HP1', 'GO2'): 0.4}
     """
     patterns_to_del = []
     for pat in freq_pat.keys():
-        terms = pat.split(":")
-        if terms[0][:fix_length] == terms[1][:fix_length]:
+        if pat[0][:fix_length] == pat[1][:fix_length]:
             patterns_to_del.append(pat)
     for k in patterns_to_del:
         freq_pat.pop(k)
     return freq_pat
 
-import time as tm
-begin = tm.time()
-
-trans = [
-        ["GO1", "GO3", "GO2", "R-1"],
-        ["GO2", "HP1", "R-1"],
-        ["HP1", "GO2", "GO1"],
-        ["R-2", "GO3", "R-1"],
-        ["R-1", "GO1"]
-    ]
-w_items = {'GO1': 1, 'GO2': 1, 'R-1': 1, 'GO3': 1, 'R-2': 1, 'HP1': 1}
-freq_items, trans_weights = get_frequency_and_weight(trans_db = trans, weight_items = w_items, min_sup = 0.25)
-tree, item_nodes = construct_fptree(trans, freq_items, trans_weights)
-asso_rules = get_association_rules(tree, item_nodes)
-print(asso_rules)
-print(filter_patterns(asso_rules))
-
-end = tm.time()
-print(end - begin)
+if __name__ == "__main__":
+    begin = tm.time()
+
+    trans = [
+            ["GO1", "GO3", "GO2", "R-1"],
+            ["GO2", "HP1", "R-1"],
+            ["HP1", "GO2", "GO1"],
+            ["R-2", "GO3", "R-1"],
+            ["R-1", "GO1"]
+        ]
+    w_items = {'GO1': 1, 'GO2': 1, 'R-1': 1, 'GO3': 1, 'R-2': 1, 'HP1': 1}
+    freq_items, trans_weights = get_frequency_and_weight(trans_db = trans, weight_items = w_items, min_sup = 0.25)
+    tree, item_nodes = construct_fptree(trans, freq_items, trans_weights)
+    asso_rules = get_association_rules(tree, item_nodes)
+    print(asso_rules)
+    print(filter_patterns(asso_rules))
+
+    end = tm.time()
+    print(end - begin)
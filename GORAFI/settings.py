@@ -19,11 +19,117 @@ aspect = "biological_process"
 genes = test_genes2
 # genes are symbols instead of UniProtKB IDS:
 symbol = True
+# factors of the terms weights computed during the preparation, among "ic", "depth" and "evidence":
+weight_factors = ["ic", "evidence"]
+
+## Mining parameters:
+# expressions over the terms metadata (ontology, namespace, depth, level, n_genes, ic) selecting the terms
+# too generic to be mined, which are left out of the transactions:
+pruning_rules = [
+    "ontology != 'Reactome' and depth == 0",
+    "ontology == 'Reactome' and depth * level <= level + depth"]
+# minimum support of the frequent itemsets:
+min_support = 0.25
+# minimum supports of the terms selected by expressions over the terms metadata, e.g.
+# [("ontology == 'GO' and depth <= 3", 0.5), ("ontology == 'Reactome' and level == 0", 0.1)]: the first expression
+# selecting a term sets its minimum support, and an itemset is frequent when it reaches the lowest one of its terms
+# (the terms selected by no expression use min_support). They cannot be combined with out_of_core, contrast_genes,
+# weighted, approximate nor cantree_file, which mine the itemsets otherwise:
+min_supports = []
+# genes the genes of interest are contrasted with, e.g. down- against up-regulated genes (an empty list mines the
+# genes of interest alone); the patterns whose supports differ between both lists are written to contrast_patterns.csv:
+contrast_genes = []
+# minimum difference between the supports of a contrast pattern in both lists:
+min_difference = 0.2
+# minimum ratio between the highest and the lowest supports of a contrast pattern:
+min_growth = 2
+# metric the contrast patterns are sorted by, "difference" or "growth":
+contrast_rank = "difference"
+# maximum number of terms in a frequent itemset:
+max_len = 2
+# metric the association rules are filtered with, and its minimum value:
+metric = "confidence"
+min_threshold = 0.8
+# number of worker processes mining the itemsets (1 mines on a single core, None uses all the cores):
+n_jobs = 1
+# file keeping the FP-tree of the gene list between runs, so that editing the list only updates it (None rebuilds it):
+cantree_file = None
+# mine the weighted frequent patterns with the WOFP tree, the transactions weighing the mean precomputed weight of their terms:
+weighted = False
+# minimum weight of the weighted frequent patterns:
+min_weight = 0.2
+# mine every annotated gene of the species out of core instead of the genes of interest:
+out_of_core = False
+# memory available to load the projected transactions during out-of-core mining, in megabytes:
+memory_budget = 2048
+# number of partition files the projected transactions are written to:
+n_partitions = 64
+# mine a random sample of the genes for a quick approximate preview (with weighted, the patterns are written with the
+# weight_low and weight_high bounds of their weights):
+approximate = False
+# maximum error on the supports of the approximate itemsets, and probability of exceeding it:
+epsilon = 0.02
+delta = 0.05
+# count the approximate itemsets on all the genes to get their exact supports:
+verify = True
+# seed of the random generator (None draws a new sample on each run):
+seed = None
+# number of random gene sets drawn from the background to compute the rules p-values (0 skips the test):
+n_permutations = 0
+# GMT file of named gene lists mined together by batch_mining.py:
+gmt_file = "./data/gene_lists.gmt"
+# directory where batch_mining.py writes the rules of each list and their index:
+batch_path = "./batch"
+# address and port query_service.py listens on:
+service_host = "127.0.0.1"
+service_port = 8642
+# maximum number of query results kept in memory by query_service.py:
+cache_size = 256
+# test the over-representation of the rules against all the annotated genes of the species:
+enrichment = False
+# cluster the rules by the semantic similarity of their terms, "lin" or "resnik" (None does not cluster them):
+rule_similarity = None
+# minimum mean similarity of the rules of a cluster, between 0 and 1:
+cluster_threshold = 0.5
+# maximum number of distinct rule itemsets clustered, their similarities needing about 50 bytes per pair of itemsets
+# (above it the rules are written without clusters):
+max_cluster_itemsets = 5000
+# format the rules are written in: "csv" (rules.csv), "parquet" (rules.parquet, needs pyarrow) or "sqlite" (an indexed
+# database of the itemsets and rules queried with scripts/rulestore.py):
+output_backend = "csv"
+# SQLite file the itemsets and rules are written to by the "sqlite" backend:
+rules_db = "./rules.sqlite"
+# number of itemsets whose rules are generated and written together, bounding the memory used by the rules:
+rules_chunk_size = 100000
+# SQLite file the genes supporting each itemset are written to as compressed bitmaps, next to the rules (None skips them):
+bitmaps_db = None
+
+## Instrumentation parameters:
+# JSON lines file the time, memory and counters of each stage are appended to (None only prints them):
+spans_file = "./spans.jsonl"
+# trace the Python allocations to record the peak memory of each stage (slower):
+trace_memory = False
+# names of the stages profiled with cProfile ("all" profiles every stage), and where the profiles are written:
+profile_spans = []
+profile_path = "./profiles"
+
+## Benchmark parameters:
+# size of the synthetic ontologies and annotations of benchmark.py relative to the real ones:
+bench_scale = 0.1
+# number of genes of the synthetic species (before scaling), and of the synthetic gene list mined:
+bench_genes = 20000
+bench_list_genes = 200
+# JSON lines file the benchmark results are appended to:
+bench_file = "./benchmark.jsonl"
+# a stage slower than on the previous run of the same scale by more than this ratio is reported:
+bench_tolerance = 1.5
 
 ## Raw data relative path:
 raw_path = "./data/raw"
 ## Rdy2use data relative path:
 rdy2use_path = "./data/rdy2use"
+## Temporary data relative path:
+tmp_path = "./data/tmp"
 
 ## URLs to download data files from and their respective resulting files:
 